@@ -1,10 +1,15 @@
 import pygame
-from shared import constants
-from .tile import Tile
+from shared import constants, snapshot
+from shared.framing import FrameReader
 from .player import Player
+from .maps import MapCache
+from .text import TextCache
+from .prediction import Predictor
+from .interpolation import ServerClock
 import math
 import socket
 import threading
+import time
 import msgpack
 import base64
 
@@ -35,25 +40,55 @@ class GameClient:
         self.window_size = (constants.SCREEN_WIDTH, constants.SCREEN_HEIGHT)
         self.fullscreen = False
 
+        # Dirty-rect rendering, each frame records what it drew as (key, rect) items
+        # and only items that appeared, moved or changed are rescaled to the window
+        self.dirty_rendering = constants.DIRTY_RECT_RENDERING
+        self.frame_items = []
+        self.drawn_items = None  # Items on screen, None forces a full redraw
+        self.overlay = pygame.Surface(
+            (constants.SCREEN_WIDTH, constants.SCREEN_HEIGHT), pygame.SRCALPHA
+        )
+        self.overlay.fill((0, 0, 0, 128))
+
         # Create initial screen
         self.screen = pygame.display.set_mode(self.window_size, pygame.RESIZABLE)
         pygame.display.set_caption("Territory Ascent")
 
-        # Clock for FPS
+        # Clock for the frame rate, one frame per server tick
         self.clock = pygame.time.Clock()
 
         # Connection
         self.conn = None
 
-        # Tile Dictionary
-        self.tile_dict = {}
+        # Current map, its tiles are pre-rendered into one background surface
+        self.current_map = None
         self.tile_size = constants.TILE_SIZE
 
+        # Maps arrive once per content hash, rounds on a known map reuse its tiles
+        self.map_cache = MapCache()
+        self.pending_map = None  # Hash of the map asked for, until the server sends it
+
         # Player Dictionary, SELF.ME IS THE COLOR OF THE CLIENTS PLAYER
         self.me = None
+        self.room = None  # Room code the server put us in
         self.player_dict = {}
 
         self.lock = threading.Lock()
+        self.send_lock = threading.Lock()  # Inputs and snapshot acks are sent from different threads
+        self.reader = None  # Receive buffer of the current connection
+
+        # Latest [x, y, in_air] per player color, delta snapshots only carry changed fields
+        self.delta_players = {}
+
+        # Client-side prediction of our own player, active while a round is running
+        self.predictor = None
+        self.predicting = False
+        self.sent_buttons = None  # Buttons in the last INPUT sent, None forces the next frame to send
+        self.input_sent_at = 0
+
+        # Other players are drawn from buffered snapshots a little behind the server
+        self.server_clock = ServerClock()
+        self.extrapolation_limit = constants.EXTRAPOLATION_LIMIT
 
         # Game Logic
         self.running = False
@@ -64,7 +99,7 @@ class GameClient:
         self.winner_display_start_time = None
 
         # Countdown
-        self.font = pygame.font.SysFont(constants.FONT_NAME, 150)
+        self.text = TextCache()  # Fonts and rendered labels, reused across frames
         self.countdown = 0
         self.go_timer = 0
 
@@ -86,32 +121,24 @@ class GameClient:
             midleft=(self.button_rect.left + 10, self.button_rect.centery)
         )
 
+    def frame_reader(self, conn):
+        if self.reader is None or self.reader.sock is not conn:
+            self.reader = FrameReader(conn)
+        return self.reader
+
     def receive_message(self, conn):
-        # First, receive the 4-byte header that contains the length
-        length_data = b""
-        while len(length_data) < 4:
-            chunk = conn.recv(4 - len(length_data))
-            if not chunk:
-                raise Exception("Error: Connection lost while receiving length header.")
-            length_data += chunk
-
-        # Convert the 4-byte length data to an integer
-        message_length = int.from_bytes(length_data, byteorder="big")
-
-        # Now, receive the actual message of the specified length
-        message_data = b""
-        while len(message_data) < message_length:
-            chunk = conn.recv(message_length - len(message_data))
-            if not chunk:
-                raise Exception("Error: Connection lost while receiving message.")
-            message_data += chunk
-
-        return message_data
+        """Returns the payload of the next frame from conn, valid until the next call."""
+        return self.frame_reader(conn).read_frame()
+
+    def receive_messages(self, conn):
+        """Yields payloads from conn as they arrive, each valid until the next is taken."""
+        return self.frame_reader(conn).pump()
 
     def send_message(self, conn, message):
         message_pack = msgpack.packb(message)
         length_message = len(message_pack).to_bytes(4, byteorder="big")
-        conn.sendall(length_message + message_pack)
+        with self.send_lock:
+            conn.sendall(length_message + message_pack)
 
     def toggle_fullscreen(self):
         self.fullscreen = not self.fullscreen
@@ -121,6 +148,7 @@ class GameClient:
         else:
             self.window_size = (constants.SCREEN_WIDTH, constants.SCREEN_HEIGHT)
             self.screen = pygame.display.set_mode(self.window_size, pygame.RESIZABLE)
+        self.drawn_items = None
 
     def connect(self):  # Used to connect to server and parse initial data from server
         try:
@@ -129,6 +157,9 @@ class GameClient:
             else:
                 code = self.game_code
 
+            # An optional /ROOM suffix picks the room, otherwise any open room
+            code, _, room = code.strip().partition("/")
+
             if len(code) > 6:
                 ip = code
             else:
@@ -153,8 +184,9 @@ class GameClient:
                 print("connection failed: check IP address, or game code")
                 return None, "Failed to connect\n" + str(e)
 
-            # Receive initial data
+            # Join a room, then receive initial data
             try:
+                self.send_message(conn, {"type": "JOIN", "room": room or None})
                 data = self.receive_message(conn)
             except Exception as e:
                 conn.close()
@@ -167,14 +199,19 @@ class GameClient:
 
             # Check for error message
             if initial_data == "Error: No more colors available":
-                e = "Error: Server full, No more player slots available"
+                e = "Error: Room full, No more player slots available"
                 conn.close()
                 return None, str(e)
+            if isinstance(initial_data, str):
+                conn.close()
+                return None, initial_data
 
             # Parse initial data
             if initial_data["type"] == "INITIAL":
                 self.me = initial_data["YourPlayer"]
-                print(f"You are {self.me} player")
+                self.room = initial_data["Room"]
+                print(f"You are {self.me} player in room {self.room}")
+                self.predictor = Predictor(self.me)
 
                 # Create players
                 player_data = initial_data["Players"]
@@ -186,6 +223,19 @@ class GameClient:
                         player_info["in_air"],
                     )
 
+                # Ask for the most compact STATE snapshots the server supports
+                snapshot_formats = initial_data.get("SnapshotFormats", [])
+                for snapshot_format in ["delta", "binary"]:
+                    if snapshot_format in snapshot_formats:
+                        self.send_message(
+                            conn, {"type": "FORMAT", "format": snapshot_format}
+                        )
+                        break
+
+                # Delta streams go quiet when nothing changes, a gap there is not a late frame
+                if "delta" in snapshot_formats:
+                    self.extrapolation_limit = 0
+
                 # Set waiting room flag
                 self.waiting = True
 
@@ -222,17 +272,17 @@ class GameClient:
             with self.lock:
                 conn.close()
 
-    def create_tile_map(
-        self, tile_data
-    ):  # Used to create the tile map from info from server
-        self.tile_dict = {}
-        for tile_info in tile_data:
-            x = tile_info["x"]
-            y = tile_info["y"]
-            tile_type = tile_info["type"]
-            self.tile_dict[(x, y)] = Tile(
-                x, y, self.tile_size, self.tile_size, tile_type
-            )
+    def load_map(self, compiled):
+        """Shows a compiled map and starts predicting our player on it."""
+        compiled.reset()
+        with self.lock:
+            self.current_map = compiled
+
+            # Predict our player from the spawn point once the countdown ends
+            self.predictor.load_map(compiled.tile_data, compiled.spawn)
+            self.predictor.reset(*compiled.spawn)
+            self.predicting = True
+            self.sent_buttons = None  # The server released all buttons for the new round
 
     def create_player(
         self, color, x, y, in_air
@@ -255,13 +305,15 @@ class GameClient:
                 self.ready = True
 
         elif self.countdown <= 0:
+            direction = None
+            drag = None
 
             # Movement (Left, Right) (No acceleration) (No moving while jumping or dragging)
             if not me.dragging and not me.in_air:
                 if keys[pygame.K_a] and not keys[pygame.K_d]:
-                    self.send_message(conn, {"type": "MOVE", "direction": "left"})
+                    direction = "left"
                 elif keys[pygame.K_d] and not keys[pygame.K_a]:
-                    self.send_message(conn, {"type": "MOVE", "direction": "right"})
+                    direction = "right"
 
             # Mouse Drag Jumping
             if mouse_pressed[0] and not me.in_air and not me.dragging:
@@ -285,15 +337,51 @@ class GameClient:
                 if not mouse_pressed[0]:
                     me.dragging = False
                     me.preserve_drag_state = False  # Disable preserving drag state
-                    # Send jump message with drag vector
-                    self.send_message(
-                        conn,
-                        {
-                            "type": "JUMP",
-                            "drag_x": me.drag_vector.x,
-                            "drag_y": me.drag_vector.y,
-                        },
-                    )
+                    # Jump with the drag vector
+                    drag = (me.drag_vector.x, me.drag_vector.y)
+
+            self.send_inputs(conn, direction, drag)
+
+            # Show the result right away instead of a round trip later
+            self.predict(direction, drag)
+
+    def send_inputs(self, conn, direction, drag):
+        """Sends an INPUT if the held buttons changed, a jump was released or the keepalive is due.
+
+        The server keeps buttons held until the next INPUT, so unchanged input isn't resent every frame.
+        """
+        buttons = {None: 0, "left": constants.INPUT_LEFT, "right": constants.INPUT_RIGHT}[direction]
+        now = time.monotonic()
+        if (
+            buttons != self.sent_buttons
+            or drag is not None
+            or now - self.input_sent_at >= constants.INPUT_KEEPALIVE
+        ):
+            message = {"type": "INPUT", "buttons": buttons}
+            if drag is not None:
+                message["jump"] = list(drag)
+            self.send_input(conn, message)
+            self.sent_buttons = buttons
+            self.input_sent_at = now
+
+    def send_input(self, conn, message):
+        """Sends an INPUT tagged with the next input sequence number."""
+        with self.lock:
+            message["seq"] = self.predictor.next_input()
+        self.send_message(conn, message)
+
+    def predict(self, direction, drag):
+        """Advances our predicted player by one frame of input."""
+        with self.lock:
+            if not self.predicting:
+                return
+            self.predictor.step(direction, drag)
+            self.show_prediction()
+
+    def show_prediction(self):
+        """Moves our sprite to the predicted position, call with self.lock held."""
+        if self.me in self.player_dict:
+            self.player_dict[self.me].update(*self.predictor.position())
 
     def check_button_click(self, mouse_pos, mouse_pressed):
         """Check if the button is clicked."""
@@ -322,9 +410,18 @@ class GameClient:
         self, conn
     ):  # Used to update the game state from the servers broadcast (Player locations, tile colors), RUNS ON SEPERATE THREAD
         try:
+            messages = self.receive_messages(conn)  # Drains every frame of a recv in one pass
             while self.running:
                 try:
-                    data = self.receive_message(conn)
+                    data = next(messages)
+
+                    # Binary STATE snapshot
+                    if snapshot.is_snapshot(data):
+                        if snapshot.snapshot_kind(data) == snapshot.KIND_DELTA:
+                            self.apply_delta(conn, *snapshot.decode_delta(data))
+                        else:
+                            self.apply_state(*snapshot.decode_state(data))
+                        continue
 
                     try:
                         update_data = msgpack.unpackb(data)
@@ -348,6 +445,13 @@ class GameClient:
 
                         self.waiting = True
                         self.ready = False
+                        with self.lock:
+                            self.predicting = False
+                            self.predictor.stop()
+
+                            # Players jump to the waiting room, don't slide them there
+                            for p in self.player_dict.values():
+                                p.snapshots.clear()
                         
                         for p in self.player_dict.values():
                             p.wins = 0
@@ -378,6 +482,7 @@ class GameClient:
                             with self.lock:
                                 if color in self.player_dict:
                                     self.player_dict[color].update(x, y, in_air)
+                                    self.player_dict[color].snapshots.clear()
                                 else:
                                     self.create_player(color, x, y, in_air)
 
@@ -388,49 +493,50 @@ class GameClient:
                             with self.lock:
                                 del self.player_dict[color]
 
-                        # Reset tile map
-                        tile_data = update_data["TileMap"]
-                        self.create_tile_map(tile_data)
+                        # Reset tile map, downloading it if it isn't cached
+                        compiled = self.map_cache.get(update_data["MapHash"])
+                        if compiled is not None:
+                            self.pending_map = None
+                            self.load_map(compiled)
+                        else:
+                            with self.lock:
+                                self.current_map = None
+                            self.pending_map = update_data["MapHash"]
+                            self.send_message(
+                                conn, {"type": "MAP", "hash": self.pending_map}
+                            )
+
+                    elif update_data["type"] == "MAP":
+                        compiled = self.map_cache.add(
+                            update_data["MapHash"],
+                            update_data["TileMap"],
+                            update_data["Spawn"],
+                        )
+                        if compiled is not None and update_data["MapHash"] == self.pending_map:
+                            self.pending_map = None
+                            self.load_map(compiled)
 
-                        
                     elif update_data["type"] == "STATE":
-                        # Update player locations
-                        player_data = update_data["players"]
+                        tile_data = update_data["tiles"] or []
+                        self.apply_state(
+                            update_data["tick"],
+                            [
+                                (p["color"], p["x"], p["y"], p["in_air"])
+                                for p in update_data["players"]
+                            ],
+                            [(t["x"], t["y"], t["color"]) for t in tile_data],
+                        )
 
-                        # Check for new players and update existing players
-                        current_player_colors = set()
+                    elif update_data["type"] == "INPUT ACK":
+                        # Server state of our player, replay the inputs it hasn't simulated yet
                         with self.lock:
-                            current_player_colors = set(self.player_dict.keys())
-                        updated_player_colors = set()
-
-                        for player_info in player_data:
-                            color = player_info["color"]
-                            x = player_info["x"]
-                            y = player_info["y"]
-                            in_air = player_info["in_air"]
-                            updated_player_colors.add(color)
-
-                            with self.lock:
-                                if color in self.player_dict:
-                                    self.player_dict[color].update(x, y, in_air)
-
-                                else:
-                                    self.create_player(color, x, y, in_air)
-
-                        # Remove players that have disconnected
-                        for color in current_player_colors - updated_player_colors:
-                            with self.lock:
-                                del self.player_dict[color]
-
-                        # Update tile colors
-                        tile_data = update_data["tiles"]
-                        if tile_data is not None:
-                            with self.lock:
-                                for tile_info in tile_data:
-                                    x = tile_info["x"]
-                                    y = tile_info["y"]
-                                    color = tile_info["color"]
-                                    self.tile_dict[(x, y)].update(color)
+                            if self.predicting:
+                                self.predictor.reconcile(
+                                    update_data["seq"],
+                                    update_data["ticks"],
+                                    update_data["state"],
+                                )
+                                self.show_prediction()
 
                     elif update_data["type"] == "COUNTDOWN":
                         self.countdown = update_data["value"]
@@ -449,27 +555,105 @@ class GameClient:
         finally:
             self.running = False
 
+    def apply_state(self, tick, player_data, tile_data):
+        """Applies a STATE update of (color, x, y, in_air) players and (x, y, color) tiles."""
+        self.server_clock.observe(tick, time.monotonic())
+        snapshot_time = tick / constants.TICK_RATE
+
+        with self.lock:
+            current_player_colors = set(self.player_dict.keys())
+        updated_player_colors = set()
+
+        # Check for new players and update existing players
+        for color, x, y, in_air in player_data:
+            updated_player_colors.add(color)
+
+            with self.lock:
+                if color == self.me and self.predicting:
+                    continue  # Predicted locally, corrected by INPUT ACK
+
+                if color not in self.player_dict:
+                    self.create_player(color, x, y, in_air)
+                self.player_dict[color].snapshots.push(snapshot_time, x, y, in_air)
+
+        # Remove players that have disconnected
+        for color in current_player_colors - updated_player_colors:
+            with self.lock:
+                del self.player_dict[color]
+
+        # Update tile colors
+        if tile_data:
+            with self.lock:
+                for x, y, color in tile_data:
+                    if self.current_map is not None:  # Map may still be downloading
+                        self.current_map.set_color(x, y, color)
+                    self.predictor.set_tile(x, y, color)
+
+    def apply_delta(self, conn, seq, tick, keyframe, present, player_data, tile_data):
+        """Merges a delta snapshot into the latest known state and acknowledges it."""
+        if keyframe:
+            self.delta_players = {}
+
+        for color, x, y, in_air in player_data:
+            current = self.delta_players.get(color)
+            if current is None:
+                if None in (x, y, in_air):
+                    continue  # Partial record for a player we never got in full
+                self.delta_players[color] = [x, y, in_air]
+                continue
+            if x is not None:
+                current[0] = x
+            if y is not None:
+                current[1] = y
+            if in_air is not None:
+                current[2] = in_air
+
+        self.delta_players = {
+            color: self.delta_players[color]
+            for color in present
+            if color in self.delta_players
+        }
+        self.apply_state(
+            tick,
+            [(color, *fields) for color, fields in self.delta_players.items()],
+            tile_data,
+        )
+
+        self.send_message(conn, {"type": "ACK", "seq": seq})
+
+    def interpolate_players(self):
+        """Moves players to their buffered position at the render time, call with self.lock held."""
+        render_time = self.server_clock.render_time(time.monotonic())
+        if render_time is None:
+            return
+        for color, p in self.player_dict.items():
+            if color == self.me and self.predicting:
+                continue  # Drawn where the prediction puts it
+            sampled = p.snapshots.sample(render_time, self.extrapolation_limit)
+            if sampled is not None:
+                p.update(*sampled)
+
+    def mark(self, key, rect):
+        """Records something drawn this frame, key must change whenever its pixels do."""
+        self.frame_items.append((key, tuple(rect)))
+
     def draw(self):
         # Render everything onto the internal surface
-        self.scaled_surface.fill((255, 255, 255))
+        screen_rect = self.scaled_surface.get_rect()
+        with self.lock:
+            if self.current_map is not None and not self.waiting and not self.winner:
+                self.scaled_surface.blit(self.current_map.background, (0, 0))
+                self.mark(("background", id(self.current_map)), screen_rect)
+            else:
+                self.scaled_surface.fill(constants.BACKGROUND_COLOR)
+                self.mark(("background", None), screen_rect)
         if self.winner:
-            # Display winner text
+            # Display winner text in the player's color, outlined in black
             words = f"Winner is: {self.winner}!"
-            font = pygame.font.SysFont(constants.FONT_NAME, 50)
-            text = font.render(words, True, self.winner)
+            text = self.text.render(words, 50, self.winner, outline=2)
             text_rect = text.get_rect(center=(constants.SCREEN_WIDTH // 2, constants.SCREEN_HEIGHT // 2))
-
-            # Outline the text in black
-            outline_width = 2  # Adjust as needed
-            for dx in range(-outline_width, outline_width + 1):
-                for dy in range(-outline_width, outline_width + 1):
-                    if dx*dx + dy*dy <= outline_width*outline_width: # Draw only in a circle
-                        outline_rect = text_rect.move(dx, dy)
-                        outline = font.render(words, True, (0, 0, 0))  # Black outline
-                        self.scaled_surface.blit(outline, outline_rect)
-
-            # Draw the text in the player's color
             self.scaled_surface.blit(text, text_rect)
+            self.mark(("text", words), text_rect)
 
         else:
             if self.waiting:
@@ -504,6 +688,10 @@ class GameClient:
                     self.scaled_surface, button_color, self.button_rect, border_radius=12
                 )
                 self.scaled_surface.blit(self.button_text, self.button_text_rect)
+                self.mark(
+                    ("button", button_color, self.ready),
+                    self.button_rect.union(self.button_rect.move(*shadow_offset)),
+                )
 
                 # Draw checkmark box (always visible)
                 checkmark_box_size = 30
@@ -529,42 +717,36 @@ class GameClient:
 
                 # Draw checkmark if ready
                 if self.ready:
-                    checkmark_font = pygame.font.SysFont(constants.FONT_NAME, 25)
-                    checkmark_text = checkmark_font.render(
-                        u"\u2713", True, (0, 255, 0)
+                    checkmark_text = self.text.render(
+                        u"\u2713", 25, (0, 255, 0)
                     )  # Unicode checkmark
                     checkmark_rect = checkmark_text.get_rect(
                         center=checkmark_box_rect.center
                     )
                     self.scaled_surface.blit(checkmark_text, checkmark_rect)
 
-            else:
-                # Draw tiles
-                for t in self.tile_dict.values():
-                    self.scaled_surface.blit(t.image, t.rect)
+                # Room code, friends join the same room with <game code>/<room>
+                if self.room:
+                    room_text = self.text.render(
+                        f"Room {self.room}", 20, (255, 255, 255), outline=2
+                    )
+                    self.scaled_surface.blit(room_text, (10, 10))
+                    self.mark(("text", self.room), room_text.get_rect(topleft=(10, 10)))
 
             # Draw players
             with self.lock:
+                self.interpolate_players()
                 for p in self.player_dict.values():
                     self.scaled_surface.blit(p.image, p.rect)
+                    self.mark(("player", p.color), p.rect)
 
                     if self.waiting:
-                        font = pygame.font.SysFont(constants.FONT_NAME, 20)
+                        # Name in the player's color, outlined in black
                         words = p.color if p.color != self.me else "You"
-                        text = font.render(words, True, p.color)
+                        text = self.text.render(words, 20, p.color, outline=2)
                         text_rect = text.get_rect(center=(p.rect.centerx, p.rect.bottom + 15))
-
-                        # Outline the text in black
-                        outline_width = 2  # Adjust as needed
-                        for dx in range(-outline_width, outline_width + 1):
-                            for dy in range(-outline_width, outline_width + 1):
-                                if dx*dx + dy*dy <= outline_width*outline_width: # Draw only in a circle
-                                    outline_rect = text_rect.move(dx, dy)
-                                    outline = font.render(words, True, (0, 0, 0))  # Black outline
-                                    self.scaled_surface.blit(outline, outline_rect)
-
-                        # Draw the text in the player's color
                         self.scaled_surface.blit(text, text_rect)
+                        self.mark(("text", words, p.color), text_rect)
 
             # Draw drag vector if dragging
             if self.me and self.player_dict[self.me].dragging:
@@ -591,60 +773,62 @@ class GameClient:
                 pygame.draw.line(self.scaled_surface, (0, 0, 255), end_pos, left_arrow, 3)
                 pygame.draw.line(self.scaled_surface, (0, 0, 255), end_pos, right_arrow, 3)
 
+                # Bounding box of the lines, padded for their width
+                points = [start_pos, end_pos, left_arrow, right_arrow]
+                left = min(x for x, y in points)
+                top = min(y for x, y in points)
+                arrow_rect = pygame.Rect(
+                    left,
+                    top,
+                    max(x for x, y in points) - left,
+                    max(y for x, y in points) - top,
+                ).inflate(8, 8)
+                self.mark(("arrow", start_pos, end_pos), arrow_rect)
+
             current_time = pygame.time.get_ticks()
 
             # Draw countdown if active
             if self.countdown > 0:
-                # Create a semi-transparent overlay
-                overlay = pygame.Surface(
-                    (constants.SCREEN_WIDTH, constants.SCREEN_HEIGHT), pygame.SRCALPHA
-                )
-                overlay.fill((0, 0, 0, 128))
-                self.scaled_surface.blit(overlay, (0, 0))
+                # Semi-transparent overlay
+                self.scaled_surface.blit(self.overlay, (0, 0))
+                self.mark(("overlay",), screen_rect)
 
                 # Render countdown text
-                countdown_text = self.font.render(
+                countdown_text = self.text.render(
                     str(self.countdown if self.countdown != 999 else ""),
-                    True,
+                    150,
                     (255, 255, 255),
                 )
                 text_rect = countdown_text.get_rect(
                     center=(constants.SCREEN_WIDTH // 2, constants.SCREEN_HEIGHT // 2)
                 )
                 self.scaled_surface.blit(countdown_text, text_rect)
+                self.mark(("text", self.countdown), text_rect)
 
-                ready_font = pygame.font.SysFont(constants.FONT_NAME, 70)
-                ready_text = ready_font.render("Get Ready!", True, (255, 255, 255))
+                ready_text = self.text.render("Get Ready!", 70, (255, 255, 255))
                 ready_rect = ready_text.get_rect(
                     center=(constants.SCREEN_WIDTH // 2, constants.SCREEN_HEIGHT // 2 - 100)
                 )
                 self.scaled_surface.blit(ready_text, ready_rect)
+                self.mark(("text", "Get Ready!"), ready_rect)
                 
                 # Display scores at the bottom
-                score_font = pygame.font.SysFont(constants.FONT_NAME, 30)
                 y_offset = 0
                 x_offset = 0
                 count = 0
                 for color, player in self.player_dict.items():
                     word = color if color != self.me else "You"
-                    score_text = score_font.render(f"{word}: {player.wins}", True, color)
+                    score_text = self.text.render(
+                        f"{word}: {player.wins}", 30, color, outline=2
+                    )
                     score_rect = score_text.get_rect(
                         center=(
                             constants.SCREEN_WIDTH // 5 + x_offset,
                             constants.SCREEN_HEIGHT - 80 + y_offset,
                         )
                     )
-
-                    # Outline the text in black
-                    outline_width = 2  # Adjust as needed
-                    for dx in range(-outline_width, outline_width + 1):
-                        for dy in range(-outline_width, outline_width + 1):
-                            if dx*dx + dy*dy <= outline_width*outline_width: # Draw only in a circle
-                                outline_rect = score_rect.move(dx, dy)
-                                outline = score_font.render(f"{word}: {player.wins}", True, (0, 0, 0))  # Black outline
-                                self.scaled_surface.blit(outline, outline_rect)
-
                     self.scaled_surface.blit(score_text, score_rect)
+                    self.mark(("text", word, player.wins), score_rect)
                     x_offset += constants.SCREEN_WIDTH // 5  # Move to the next column
 
                     count += 1
@@ -654,19 +838,69 @@ class GameClient:
 
             elif self.countdown == 0 and self.go_timer > 0:
                 if current_time - self.go_timer < 1000:
-                    go_text = self.font.render("GO!", True, (0, 151, 0))
+                    go_text = self.text.render("GO!", 150, (0, 151, 0))
                     go_rect = go_text.get_rect(
                         center=(constants.SCREEN_WIDTH // 2, constants.SCREEN_HEIGHT // 2)
                     )
                     self.scaled_surface.blit(go_text, go_rect)
+                    self.mark(("text", "GO!"), go_rect)
                 else:
                     self.go_timer = 0
 
-        # Scale the internal surface to fit the window using nearest-neighbor scaling
-        scaled_surface = pygame.transform.scale(self.scaled_surface, self.window_size)
-        self.screen.blit(scaled_surface, (0, 0))
+        self.present()
+
+    def present(self):
+        """Scales the frame to the window, only the regions that changed in dirty-rect mode."""
+        items = set(self.frame_items)
+        self.frame_items = []
+        with self.lock:
+            tile_rects = self.current_map.take_dirty() if self.current_map is not None else []
+
+        screen_rect = self.scaled_surface.get_rect()
+        full = not self.dirty_rendering or self.drawn_items is None
+        changed = []
+        if not full:
+            for rect in [pygame.Rect(rect) for key, rect in items ^ self.drawn_items] + tile_rects:
+                rect = rect.clip(screen_rect)
+                if rect == screen_rect:
+                    full = True
+                    break
+                if rect.width and rect.height:
+                    changed.append(rect)
+        self.drawn_items = items
+
+        if full:
+            # Scale the internal surface to fit the window using nearest-neighbor scaling
+            scaled_surface = pygame.transform.scale(self.scaled_surface, self.window_size)
+            self.screen.blit(scaled_surface, (0, 0))
 
-        pygame.display.flip()  # Update screen
+            pygame.display.flip()  # Update screen
+            return
+
+        # Scale each changed region on its own, the rest of the window keeps last frame's pixels.
+        # Nearest-neighbor scaling repeats every SCREEN_WIDTH / gcd(window width, SCREEN_WIDTH)
+        # pixels, regions aligned to that period scale exactly like the whole frame would.
+        width, height = self.window_size
+        period_x = constants.SCREEN_WIDTH // math.gcd(width, constants.SCREEN_WIDTH)
+        period_y = constants.SCREEN_HEIGHT // math.gcd(height, constants.SCREEN_HEIGHT)
+        window_rects = []
+        for rect in changed:
+            left = rect.left // period_x * period_x
+            top = rect.top // period_y * period_y
+            right = -(-rect.right // period_x) * period_x
+            bottom = -(-rect.bottom // period_y) * period_y
+            source = pygame.Rect(left, top, right - left, bottom - top)
+            target = pygame.Rect(
+                left * width // constants.SCREEN_WIDTH,
+                top * height // constants.SCREEN_HEIGHT,
+                source.width * width // constants.SCREEN_WIDTH,
+                source.height * height // constants.SCREEN_HEIGHT,
+            )
+            region = pygame.transform.scale(self.scaled_surface.subsurface(source), target.size)
+            self.screen.blit(region, target)
+            window_rects.append(target)
+        if window_rects:
+            pygame.display.update(window_rects)
 
     def run(self):  # RUNS ON MAIN THREAD
 
@@ -703,6 +937,7 @@ class GameClient:
                         self.screen = pygame.display.set_mode(
                             self.window_size, pygame.RESIZABLE
                         )
+                        self.drawn_items = None
                 elif event.type == pygame.KEYDOWN and event.key == pygame.K_F11:
                     self.toggle_fullscreen()
 
@@ -713,8 +948,8 @@ class GameClient:
             # Drawing
             self.draw()
 
-            # FPS Limit
-            self.clock.tick(constants.FPS)
+            # Frame limit, prediction runs one server tick per frame
+            self.clock.tick(constants.TICK_RATE)
 
         update_thread.join()
         self.disconnect(self.conn)
@@ -0,0 +1,95 @@
+from collections import deque
+from shared import constants
+
+
+class ServerClock:
+    """Maps local time to the server's tick clock from the ticks STATE frames carry.
+
+    The offset follows the least delayed frame, rising slowly so it recovers
+    when the server skips ticks. Snapshots are drawn delay seconds behind it,
+    at least INTERPOLATION_INTERVALS of the measured send interval.
+    """
+
+    def __init__(self):
+        self.offset = None  # Local time minus server time of the least delayed frame
+        self.last_tick = None
+        self.interval = 1 / constants.SEND_RATE  # Smoothed server seconds between snapshots
+
+    def observe(self, tick, now):
+        offset = now - tick / constants.TICK_RATE
+        if self.offset is None or offset < self.offset:
+            self.offset = offset
+        else:
+            self.offset += (offset - self.offset) * 0.01
+
+        if self.last_tick is not None and tick > self.last_tick:
+            # Cap gaps, delta streams go quiet while nothing moves
+            gap = min((tick - self.last_tick) / constants.TICK_RATE, 1 / constants.MIN_SEND_RATE)
+            self.interval += (gap - self.interval) * 0.1
+        self.last_tick = tick
+
+    def delay(self):
+        return max(
+            constants.INTERPOLATION_DELAY,
+            constants.INTERPOLATION_INTERVALS * self.interval,
+        )
+
+    def render_time(self, now):
+        """Returns the server time, in seconds, remote players should be drawn at."""
+        if self.offset is None:
+            return None
+        return now - self.offset - self.delay()
+
+
+class SnapshotBuffer:
+    """Recent (time, x, y, in_air) snapshots of one player in server seconds."""
+
+    def __init__(self):
+        self.snapshots = deque(maxlen=constants.INTERPOLATION_BUFFER_SIZE)
+
+    def clear(self):
+        self.snapshots.clear()
+
+    def push(self, time, x, y, in_air):
+        if self.snapshots and self.snapshots[-1][0] >= time:
+            self.snapshots.pop()  # Same tick sent again, keep the newest
+        self.snapshots.append((time, x, y, in_air))
+
+    def sample(self, time, extrapolation_limit):
+        """Returns (x, y, in_air) at time, or None if there are no snapshots.
+
+        Between two snapshots the position is interpolated, past the newest it
+        is extrapolated for at most extrapolation_limit seconds, then held.
+        """
+        snapshots = self.snapshots
+        if not snapshots:
+            return None
+
+        # Drop snapshots no longer needed to interpolate at time
+        while len(snapshots) > 2 and snapshots[1][0] <= time:
+            snapshots.popleft()
+
+        older = snapshots[0]
+        if time <= older[0]:
+            return older[1:]
+
+        if len(snapshots) > 1 and time <= snapshots[1][0]:
+            newer = snapshots[1]
+            fraction = (time - older[0]) / (newer[0] - older[0])
+            return (
+                older[1] + (newer[1] - older[1]) * fraction,
+                older[2] + (newer[2] - older[2]) * fraction,
+                older[3],
+            )
+
+        # Past the newest snapshot, keep moving at the last known velocity for a while
+        newest = snapshots[-1]
+        if len(snapshots) < 2 or extrapolation_limit <= 0:
+            return newest[1:]
+        previous = snapshots[-2]
+        ahead = min(time - newest[0], extrapolation_limit) / (newest[0] - previous[0])
+        return (
+            newest[1] + (newest[1] - previous[1]) * ahead,
+            newest[2] + (newest[2] - previous[2]) * ahead,
+            newest[3],
+        )
@@ -0,0 +1,99 @@
+import os
+import pygame
+import msgpack
+from shared import constants, maps
+from .tile import Tile
+
+
+class CompiledMap:
+    """A map's tile sprites, built once and reused every round it is played.
+
+    All tiles are composited into one background surface, so a frame draws
+    the map with a single blit. Recolored platforms are redrawn into it.
+    """
+
+    def __init__(self, tile_data, spawn, tile_size=constants.TILE_SIZE):
+        self.tile_data = tile_data
+        self.spawn = spawn
+        self.tiles = {}
+        self.platforms = []
+        for tile_info in tile_data:
+            x = tile_info["x"]
+            y = tile_info["y"]
+            tile = Tile(x, y, tile_size, tile_size, tile_info["type"])
+            self.tiles[(x, y)] = tile
+            if tile_info["type"] == 2:
+                self.platforms.append(tile)
+
+        self.background = pygame.Surface(
+            (constants.SCREEN_WIDTH, constants.SCREEN_HEIGHT)
+        )
+        self.background.fill(constants.BACKGROUND_COLOR)
+        for tile in self.tiles.values():
+            self.background.blit(tile.image, tile.rect)
+        self.dirty = []  # Rects of tiles redrawn since the client last presented a frame
+
+    def reset(self):
+        """Clears platform colors left over from the last round on this map."""
+        for tile in self.platforms:
+            image = tile.image
+            tile.update(constants.DEFAULT_PLATFORM_COLOR)
+            if tile.image is not image:
+                self.background.blit(tile.image, tile.rect)
+                self.dirty.append(tile.rect)
+
+    def set_color(self, x, y, color):
+        """Recolors the platform at (x, y) and redraws only that tile."""
+        tile = self.tiles.get((x, y))
+        if tile is None:
+            return
+        image = tile.image
+        tile.update(color)
+        if tile.image is not image:
+            self.background.blit(tile.image, tile.rect)
+            self.dirty.append(tile.rect)
+
+    def take_dirty(self):
+        """Returns and forgets the rects of tiles redrawn since the last call."""
+        dirty, self.dirty = self.dirty, []
+        return dirty
+
+
+class MapCache:
+    """Compiled maps keyed by content hash, in memory and, if directory is set, on disk."""
+
+    def __init__(self, directory=constants.MAP_CACHE_DIR):
+        self.maps = {}  # hash -> CompiledMap
+        self.directory = os.path.expanduser(directory) if directory else None
+
+    def path(self, map_hash):
+        return os.path.join(self.directory, f"{map_hash}.msgpack")
+
+    def get(self, map_hash):
+        """Returns the compiled map, or None if the server has to send it."""
+        if map_hash not in self.maps and self.directory:
+            try:
+                with open(self.path(map_hash), "rb") as f:
+                    tile_data, spawn = msgpack.unpackb(f.read())
+                self.add(map_hash, tile_data, spawn, save=False)
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                print(f"Ignoring cached map {map_hash}: {e}")
+        return self.maps.get(map_hash)
+
+    def add(self, map_hash, tile_data, spawn, save=True):
+        """Compiles and stores a map, returns None if its content doesn't match the hash."""
+        if maps.map_hash(tile_data, spawn) != map_hash:
+            print(f"Map {map_hash} doesn't match its hash")
+            return None
+        self.maps[map_hash] = CompiledMap(tile_data, spawn)
+
+        if save and self.directory:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                with open(self.path(map_hash), "wb") as f:
+                    f.write(msgpack.packb([tile_data, spawn]))
+            except OSError as e:
+                print(f"Could not cache map {map_hash}: {e}")
+        return self.maps[map_hash]
@@ -1,4 +1,5 @@
 import pygame
+from .interpolation import SnapshotBuffer
 
 
 class Player(pygame.sprite.Sprite):
@@ -31,6 +32,9 @@ class Player(pygame.sprite.Sprite):
         self.drag_vector = pygame.math.Vector2(0, 0)
         self.in_air = in_air
         self.preserve_drag_state = False
+
+        # Server snapshots, drawn slightly in the past by GameClient.interpolate_players
+        self.snapshots = SnapshotBuffer()
         
         # Wins
         self.wins = 0
@@ -0,0 +1,107 @@
+from collections import deque
+from shared import constants
+from server.player import Player
+from server.tile import Tile
+from server.collision import TileGrid, merge_solid_cells
+from server.geometry import Group, Vector2
+
+
+class Predictor:
+    """Runs the server's player physics for the local player so input shows up at once.
+
+    Each predicted frame is kept with the input it used. When an INPUT ACK
+    says the server has simulated ticks ticks since it picked up input seq,
+    the server's state replaces the prediction and the frames the server
+    has not simulated yet are replayed on top of it. The client loop runs
+    at TICK_RATE, so one frame predicts one server tick.
+    """
+
+    def __init__(self, color, tile_size=constants.TILE_SIZE):
+        self.color = color
+        self.tile_size = tile_size
+        self.body = None  # server.player.Player, None until a round starts
+        self.tile_grid = TileGrid(tile_size)
+        self.platforms = {}  # (x, y) -> platform tile, occupancy follows the tile colors
+        self.spawn = None
+
+        self.frame = 0  # Index of the next predicted frame
+        self.history = deque(maxlen=constants.PREDICTION_HISTORY)  # (frame, direction, drag)
+        self.input_seq = 0  # Newest input sequence sent to the server
+        self.sent_at = {}  # input sequence -> frame it was first predicted in
+
+    def load_map(self, tile_data, spawn):
+        """Builds the collision grid from a NEW GAME tile map."""
+        map = [[0] * constants.GRID_WIDTH for _ in range(constants.GRID_HEIGHT)]
+        self.tile_grid.clear()
+        self.platforms = {}
+        for tile_info in tile_data:
+            x = tile_info["x"]
+            y = tile_info["y"]
+            map[y // self.tile_size][x // self.tile_size] = tile_info["type"]
+
+            if tile_info["type"] == 2:
+                tile = Tile(x, y, self.tile_size, self.tile_size, 2, Group())
+                self.tile_grid.add("platform", tile)
+                self.platforms[(x, y)] = tile
+
+        for kind, tile_type in (("ground", 1), ("goal", 3)):
+            for block in merge_solid_cells(map, tile_type):
+                self.tile_grid.add_solid(kind, *block)
+        self.spawn = spawn
+
+    def reset(self, x, y):
+        """Starts predicting a new round from the player's spawn position."""
+        self.body = Player(self.color, (x, y), self.tile_size, self.tile_size)
+        self.history.clear()
+        self.sent_at = {self.input_seq: self.frame}
+
+    def stop(self):
+        self.body = None
+
+    def next_input(self):
+        """Returns the sequence number to tag the next INPUT with."""
+        self.input_seq += 1
+        self.sent_at[self.input_seq] = self.frame
+        return self.input_seq
+
+    def step(self, direction, drag):
+        """Predicts one frame of held direction, drag is the (x, y) jump vector if a jump was sent."""
+        self.history.append((self.frame, direction, drag))
+        self.simulate(direction, drag)
+        self.frame += 1
+
+    def simulate(self, direction, drag):
+        self.body.direction = direction
+        if drag is not None:
+            self.body.jump = True
+            self.body.drag_vector = Vector2(*drag)
+        self.body.update(self.tile_grid, self.spawn, check_goal=False)
+
+    def reconcile(self, seq, ticks, state):
+        """Rebases the prediction on the server's state and replays newer frames."""
+        if seq not in self.sent_at:
+            return  # Input from before the current round
+        last_simulated = self.sent_at[seq] + ticks - 1
+        for old in [s for s in self.sent_at if s < seq]:
+            del self.sent_at[old]
+
+        x, y, velocity_x, velocity_y, in_air = state
+        self.body.position = Vector2(x, y)
+        self.body.rect.bottomleft = self.body.position
+        self.body.velocity = Vector2(velocity_x, velocity_y)
+        self.body.in_air = in_air
+
+        while self.history and self.history[0][0] <= last_simulated:
+            self.history.popleft()
+        for frame, direction, drag in self.history:
+            self.simulate(direction, drag)
+
+    def set_tile(self, x, y, color):
+        """Mirrors a platform color from the server, colored platforms are occupied."""
+        tile = self.platforms.get((x, y))
+        if tile is not None:
+            tile.occupied_by = color if isinstance(color, str) else None
+
+    def position(self):
+        """Returns (x, y, in_air) of the predicted player."""
+        return self.body.position.x, self.body.position.y, self.body.in_air
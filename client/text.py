@@ -0,0 +1,51 @@
+from collections import OrderedDict
+import pygame
+from shared import constants
+
+
+class TextCache:
+    """Rendered text keyed by (font, size, text, color, outline), least recently used evicted.
+
+    Fonts are loaded once per (name, size). Outlined text is composited into a
+    single surface, so drawing it is one blit instead of one per outline offset.
+    """
+
+    def __init__(self, max_entries=constants.TEXT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.fonts = {}  # (name, size) -> pygame.font.Font
+        self.surfaces = OrderedDict()  # key -> Surface, oldest use first
+
+    def font(self, size, name=constants.FONT_NAME):
+        key = (name, size)
+        if key not in self.fonts:
+            self.fonts[key] = pygame.font.SysFont(name, size)
+        return self.fonts[key]
+
+    def render(self, text, size, color, outline=0, name=constants.FONT_NAME):
+        """Returns text rendered in color, with a black outline outline pixels wide."""
+        key = (name, size, text, str(color), outline)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            return surface
+
+        font = self.font(size, name)
+        surface = font.render(text, True, color)
+        if outline:
+            # Black copies in a circle around the text, then the text on top
+            shadow = font.render(text, True, (0, 0, 0))
+            width, height = surface.get_size()
+            outlined = pygame.Surface(
+                (width + 2 * outline, height + 2 * outline), pygame.SRCALPHA
+            )
+            for dx in range(-outline, outline + 1):
+                for dy in range(-outline, outline + 1):
+                    if dx * dx + dy * dy <= outline * outline:
+                        outlined.blit(shadow, (outline + dx, outline + dy))
+            outlined.blit(surface, (outline, outline))
+            surface = outlined
+
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_entries:
+            self.surfaces.popitem(last=False)
+        return surface
@@ -2,6 +2,48 @@ import pygame
 from shared import constants
 
 
+# Pre-rendered platform surfaces, (color, width, height) -> Surface
+platform_images = {}
+
+
+def platform_image(color_name, width, height):
+    """Returns the shared surface of a platform in color_name, rendering it on first use.
+
+    The default color is drawn as is, player colors are lightened so the
+    player stays visible on top of the platforms it occupies.
+    """
+    color_key = color_name if isinstance(color_name, str) else tuple(color_name)
+    key = (color_key, width, height)
+    if key in platform_images:
+        return platform_images[key]
+
+    # Convert color name to RGB values
+    color = pygame.Color(color_name)
+    if color_key == constants.DEFAULT_PLATFORM_COLOR:
+        border_color = (
+            color[0] - 30,
+            color[1] - 30,
+            color[2] - 30,
+        )
+    else:
+        color = (
+            min(255, color.r + 100),
+            min(255, color.g + 100),
+            min(255, color.b + 100),
+        )
+        border_color = (
+            max(0, color[0] - 30),
+            max(0, color[1] - 30),
+            max(0, color[2] - 30),
+        )
+
+    image = pygame.Surface([width, height])
+    image.fill(border_color)
+    pygame.draw.rect(image, color, [0, height // 2, width, height // 2])
+    platform_images[key] = image
+    return image
+
+
 class Tile(pygame.sprite.Sprite):
     def __init__(self, x, y, width, height, image_integer):
         super().__init__()
@@ -9,7 +51,8 @@ class Tile(pygame.sprite.Sprite):
         self.width = width
         self.height = height
 
-        self.image = pygame.Surface([self.width, self.height])
+        if image_integer != 2:
+            self.image = pygame.Surface([self.width, self.height])
 
         if image_integer == 1:
             ground_color = (170, 120, 80)
@@ -23,20 +66,9 @@ class Tile(pygame.sprite.Sprite):
             )
 
         if image_integer == 2:
-            platform_color = (
-                constants.DEFAULT_PLATFORM_COLOR
-            )  # Use default platform color for now; will have to adjust for coloured occupation later
-            border_color = (
-                platform_color[0] - 30,
-                platform_color[1] - 30,
-                platform_color[2] - 30,
-            )
-
-            self.image.fill(border_color)
-            pygame.draw.rect(
-                self.image,
-                platform_color,
-                [0, self.height // 2, self.width, self.height // 2],
+            # Platforms share one surface per color from the palette
+            self.image = platform_image(
+                constants.DEFAULT_PLATFORM_COLOR, self.width, self.height
             )
 
         if image_integer == 3:
@@ -52,31 +84,4 @@ class Tile(pygame.sprite.Sprite):
         self.rect.topleft = (x, y)
 
     def update(self, color_name):
-        # Convert color name to RGB values
-        try:
-            if color_name == [120, 120, 120]:
-                color = pygame.Color(color_name)
-                border_color = (
-                    color[0] - 30,
-                    color[1] - 30,
-                    color[2] - 30,
-                )
-            else:
-                color = pygame.Color(color_name)
-                color = (
-                    min(255, color.r + 100),
-                    min(255, color.g + 100),
-                    min(255, color.b + 100),
-                )
-                border_color = (
-                    max(0, color[0] - 30),
-                    max(0, color[1] - 30),
-                    max(0, color[2] - 30),
-                )
-        except ValueError:
-            color = color_name
-
-        self.image.fill(border_color)
-        pygame.draw.rect(
-            self.image, color, [0, self.height // 2, self.width, self.height // 2]
-        )
+        self.image = platform_image(color_name, self.width, self.height)
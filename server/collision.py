@@ -0,0 +1,141 @@
+from shared import constants
+from .geometry import Rect
+
+
+def merge_solid_cells(map, tile_type):
+    """Greedily merges runs and blocks of one tile type into as few rects as possible.
+
+    Returns (col, row, width, height) rects in cells. Each row is split into
+    horizontal runs, and a run grows downward while the rows below repeat it.
+    """
+    rows = len(map)
+    claimed = set()
+    blocks = []
+    for row in range(rows):
+        col = 0
+        while col < len(map[row]):
+            if map[row][col] != tile_type or (col, row) in claimed:
+                col += 1
+                continue
+
+            # Horizontal run
+            width = 1
+            while (
+                col + width < len(map[row])
+                and map[row][col + width] == tile_type
+                and (col + width, row) not in claimed
+            ):
+                width += 1
+
+            # Extend the run downward while the whole span matches
+            height = 1
+            while row + height < rows and all(
+                c < len(map[row + height])
+                and map[row + height][c] == tile_type
+                and (c, row + height) not in claimed
+                for c in range(col, col + width)
+            ):
+                height += 1
+
+            for r in range(row, row + height):
+                for c in range(col, col + width):
+                    claimed.add((c, r))
+            blocks.append((col, row, width, height))
+            col += width
+    return blocks
+
+
+class TileGrid:
+    """Tiles indexed by (col, row) cell so collision checks only visit nearby cells.
+
+    Solid kinds (ground, goal) are stored as merged rects, per-cell tiles are
+    only kept where they carry state (platform occupancy). Claimed platforms
+    are tracked as players land on them, so only those need checking each tick.
+    """
+
+    def __init__(self, tile_size=constants.TILE_SIZE):
+        self.tile_size = tile_size
+        self.cells = {}  # kind -> {(col, row): tile} for per-cell tiles
+        self.solid_cells = {}  # kind -> {(col, row): merged rect covering the cell}
+        self.solids = {}  # kind -> [merged rect]
+        self.occupied = {}  # Platform tiles with an occupant, used as an ordered set
+
+    def clear(self):
+        self.cells = {}
+        self.solid_cells = {}
+        self.solids = {}
+        self.occupied = {}
+
+    def occupy(self, tile, color):
+        """Claims a platform for the player of color until it leaves the tile."""
+        tile.occupied_by = color
+        self.occupied[tile] = None
+
+    def release(self, tile):
+        self.occupied.pop(tile, None)
+
+    def add(self, kind, tile):
+        col = tile.rect.x // self.tile_size
+        row = tile.rect.y // self.tile_size
+        self.cells.setdefault(kind, {})[(col, row)] = tile
+
+    def add_solid(self, kind, col, row, width, height):
+        size = self.tile_size
+        rect = Rect(col * size, row * size, width * size, height * size)
+        self.solids.setdefault(kind, []).append(rect)
+
+        cells = self.solid_cells.setdefault(kind, {})
+        for r in range(row, row + height):
+            for c in range(col, col + width):
+                cells[(c, r)] = rect
+
+    def covered_cells(self, rect):
+        """Yields the (col, row) cells rect overlaps in row-major order."""
+        size = self.tile_size
+        for row in range(rect.top // size, (rect.bottom - 1) // size + 1):
+            for col in range(rect.left // size, (rect.right - 1) // size + 1):
+                yield col, row
+
+    def colliding(self, kind, rect):
+        """Returns the tiles of a kind overlapping rect, in the same row-major order as the sprite groups."""
+        cells = self.cells.get(kind)
+        if not cells:
+            return []
+
+        found = []
+        for cell in self.covered_cells(rect):
+            tile = cells.get(cell)
+            if tile is not None and rect.colliderect(tile.rect):
+                found.append(tile)
+        return found
+
+    def first_contact(self, kind, rect):
+        """Returns the cell rect of the first solid cell rect overlaps in row-major order, or None.
+
+        This is the cell a per-tile scan would have hit first, so collision
+        response against merged rects stays identical to per-tile collision.
+        """
+        cells = self.solid_cells.get(kind)
+        if not cells:
+            return None
+
+        candidates = []
+        for cell in self.covered_cells(rect):
+            body = cells.get(cell)
+            if body is not None and body not in candidates:
+                candidates.append(body)
+
+        first = None
+        for body in candidates:
+            if not rect.colliderect(body):
+                continue
+            overlap = rect.clip(body)
+            cell = (overlap.top // self.tile_size, overlap.left // self.tile_size)
+            if first is None or cell < first:
+                first = cell
+
+        if first is None:
+            return None
+        row, col = first
+        size = self.tile_size
+        return Rect(col * size, row * size, size, size)
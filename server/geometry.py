@@ -0,0 +1,196 @@
+# Pure-Python stand-ins for the few pygame types the server simulation needs,
+# so a dedicated server never imports pygame (and with it SDL's display/video stack).
+# Semantics mirror pygame 2 so physics results are unchanged.
+import math
+
+
+def _round(value):
+    """pygame Rect setters round half away from zero."""
+    if value >= 0:
+        return int(math.floor(value + 0.5))
+    return -int(math.floor(-value + 0.5))
+
+
+class Rect:
+    __slots__ = ("x", "y", "width", "height")
+
+    def __init__(self, x, y, width, height):
+        # The pygame constructor truncates, unlike the attribute setters
+        self.x = int(x)
+        self.y = int(y)
+        self.width = int(width)
+        self.height = int(height)
+
+    def __repr__(self):
+        return f"<rect({self.x}, {self.y}, {self.width}, {self.height})>"
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, Rect)
+            and self.x == other.x
+            and self.y == other.y
+            and self.width == other.width
+            and self.height == other.height
+        )
+
+    __hash__ = None
+
+    def copy(self):
+        return Rect(self.x, self.y, self.width, self.height)
+
+    @property
+    def left(self):
+        return self.x
+
+    @property
+    def top(self):
+        return self.y
+
+    @property
+    def right(self):
+        return self.x + self.width
+
+    @property
+    def bottom(self):
+        return self.y + self.height
+
+    @property
+    def topleft(self):
+        return (self.x, self.y)
+
+    @topleft.setter
+    def topleft(self, value):
+        self.x = _round(value[0])
+        self.y = _round(value[1])
+
+    @property
+    def bottomleft(self):
+        return (self.x, self.y + self.height)
+
+    @bottomleft.setter
+    def bottomleft(self, value):
+        self.x = _round(value[0])
+        self.y = _round(value[1]) - self.height
+
+    @property
+    def center(self):
+        return (self.x + int(self.width / 2), self.y + int(self.height / 2))
+
+    @center.setter
+    def center(self, value):
+        self.x = _round(value[0]) - int(self.width / 2)
+        self.y = _round(value[1]) - int(self.height / 2)
+
+    def inflate(self, dx, dy):
+        return Rect(
+            self.x - int(dx / 2), self.y - int(dy / 2), self.width + dx, self.height + dy
+        )
+
+    def colliderect(self, other):
+        if not (self.width and self.height and other.width and other.height):
+            return False
+        return (
+            self.x < other.x + other.width
+            and self.y < other.y + other.height
+            and self.x + self.width > other.x
+            and self.y + self.height > other.y
+        )
+
+    def clip(self, other):
+        left = max(self.x, other.x)
+        top = max(self.y, other.y)
+        right = min(self.x + self.width, other.x + other.width)
+        bottom = min(self.y + self.height, other.y + other.height)
+        if right <= left or bottom <= top:
+            return Rect(self.x, self.y, 0, 0)
+        return Rect(left, top, right - left, bottom - top)
+
+
+class Vector2:
+    __slots__ = ("_x", "_y")
+
+    def __init__(self, x=0.0, y=0.0):
+        self._x = float(x)
+        self._y = float(y)
+
+    # Components are always stored as floats, like pygame
+    @property
+    def x(self):
+        return self._x
+
+    @x.setter
+    def x(self, value):
+        self._x = float(value)
+
+    @property
+    def y(self):
+        return self._y
+
+    @y.setter
+    def y(self, value):
+        self._y = float(value)
+
+    def __repr__(self):
+        return f"Vector2({self._x}, {self._y})"
+
+    def __iter__(self):
+        yield self._x
+        yield self._y
+
+    def __getitem__(self, index):
+        return (self._x, self._y)[index]
+
+    def __len__(self):
+        return 2
+
+    def __add__(self, other):
+        return Vector2(self._x + other[0], self._y + other[1])
+
+    def __iadd__(self, other):
+        self._x += other[0]
+        self._y += other[1]
+        return self
+
+    def __sub__(self, other):
+        return Vector2(self._x - other[0], self._y - other[1])
+
+    def __mul__(self, scalar):
+        return Vector2(self._x * scalar, self._y * scalar)
+
+    def __rmul__(self, scalar):
+        return Vector2(scalar * self._x, scalar * self._y)
+
+    def __truediv__(self, scalar):
+        # pygame multiplies by the reciprocal, which can differ in the last bit
+        inverse = 1 / scalar
+        return Vector2(self._x * inverse, self._y * inverse)
+
+
+class Group:
+    """Ordered set of entities, the subset of pygame.sprite.Group the server uses."""
+
+    __slots__ = ("entities",)
+
+    def __init__(self):
+        self.entities = {}  # dict keeps insertion order, like pygame's sprite dict
+
+    def __iter__(self):
+        return iter(list(self.entities))  # Copy so members can be removed while iterating
+
+    def __len__(self):
+        return len(self.entities)
+
+    def __bool__(self):
+        return bool(self.entities)
+
+    def __contains__(self, entity):
+        return entity in self.entities
+
+    def add(self, entity):
+        self.entities[entity] = None
+
+    def remove(self, entity):
+        self.entities.pop(entity, None)
+
+    def empty(self):
+        self.entities.clear()
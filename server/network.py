@@ -0,0 +1,414 @@
+import selectors
+import socket
+import threading
+from collections import deque
+import msgpack
+from shared import constants, snapshot
+from shared.framing import FrameReader
+
+
+def pack_frame(message):
+    message_pack = msgpack.packb(message)
+    return len(message_pack).to_bytes(4, byteorder="big") + message_pack
+
+
+def pack_snapshot_frame(state):
+    payload = snapshot.encode_state(state["tick"], state["players"], state["tiles"])
+    return len(payload).to_bytes(4, byteorder="big") + payload
+
+
+class SendQueue:
+    """Bounded outbound frame queue that keeps only the newest pending STATE.
+
+    Control frames (NEW GAME, COUNTDOWN, GAME OVER, ...) are always delivered.
+    STATE frames are merged into the newest one when the client falls behind,
+    carrying their tile changes forward so platform colors never desync, and
+    their trailing frame (the INPUT ACK) forward if the newer STATE has none.
+    """
+
+    def __init__(self, max_frames=constants.SEND_QUEUE_SIZE):
+        self.frames = deque()  # [data, state, pack, trailer] entries, state is None for control frames
+        self.max_frames = max_frames
+        self.condition = threading.Condition()
+        self.closed = False
+
+        # Counters
+        self.sent = 0
+        self.sent_bytes = 0
+        self.dropped = 0
+        self.max_depth = 0
+
+    def __len__(self):
+        return len(self.frames)
+
+    def put(self, data, state=None, pack=pack_frame, trailer=b""):
+        """Queues a frame, passing the unencoded state marks it as a droppable STATE.
+
+        pack re-encodes a merged state in the same format as data, trailer is
+        sent right after the STATE and survives it being merged away.
+        """
+        with self.condition:
+            if self.closed:
+                raise ConnectionError("Send queue already closed.")
+
+            # Replace a STATE still waiting at the tail instead of queueing behind it
+            if state is not None and self.frames and self.frames[-1][1] is not None:
+                older = self.frames.pop()
+                data, state = merge_states(older[1], data, state, pack)
+                trailer = trailer or older[3]
+                self.dropped += 1
+
+            self.frames.append([data, state, pack, trailer])
+            while len(self.frames) > self.max_frames:
+                self.evict_oldest_state()
+
+            self.max_depth = max(self.max_depth, len(self.frames))
+            self.condition.notify()
+
+    def evict_oldest_state(self):
+        for i, (data, state, pack, trailer) in enumerate(self.frames):
+            if state is None:
+                continue
+            del self.frames[i]
+            self.dropped += 1
+
+            # Fold tile changes into the next STATE unless a new round started in between
+            if i < len(self.frames) and self.frames[i][1] is not None:
+                self.frames[i][:2] = merge_states(state, *self.frames[i][:3])
+
+            # The trailer rides on the next STATE still queued if it has none of its own,
+            # or on a neighbouring control frame if no STATE follows
+            if trailer:
+                for j in range(i, len(self.frames)):
+                    if self.frames[j][1] is not None:
+                        self.frames[j][3] = self.frames[j][3] or trailer
+                        break
+                else:
+                    if self.frames:
+                        self.frames[min(i, len(self.frames) - 1)][3] += trailer
+            return
+
+        raise ConnectionError("Client is too far behind, send queue full.")
+
+    def get(self, block=True):
+        """Returns the next frame to write, or None if empty (or closed and drained)."""
+        with self.condition:
+            while not self.frames:
+                if self.closed or not block:
+                    return None
+                self.condition.wait()
+            data, state, pack, trailer = self.frames.popleft()
+            data += trailer
+            self.sent += 1
+            self.sent_bytes += len(data)
+            return data
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def stats(self):
+        return {
+            "depth": len(self.frames),
+            "max_depth": self.max_depth,
+            "sent": self.sent,
+            "sent_bytes": self.sent_bytes,
+            "dropped": self.dropped,
+        }
+
+
+def merge_states(older, data, state, pack):
+    """Returns (data, state) for the newer STATE with the older one's tile changes prepended."""
+    if not older.get("tiles"):
+        return data, state
+    state = dict(state, tiles=older["tiles"] + (state.get("tiles") or []))
+    return pack(state), state
+
+
+class SendRate:
+    """Per-client STATE send rate, capped by the bandwidth the client actually drains.
+
+    Each broadcast earns the client rate / max_rate of a send. Once per window
+    a client that fell behind is capped to drained bytes per second divided by
+    the mean frame size, a client that kept up recovers SEND_RATE_STEP.
+    """
+
+    def __init__(self, max_rate=constants.SEND_RATE):
+        self.max_rate = max_rate
+        self.rate = max_rate
+        self.credit = 0
+
+        # Current measurement window
+        self.window_start = None
+        self.offered_bytes = 0
+        self.offered_frames = 0
+        self.last_sent_bytes = 0
+        self.last_dropped = 0
+
+    def due(self):
+        """Called once per broadcast, returns True if this client gets the STATE."""
+        self.credit += self.rate / self.max_rate
+        if self.credit < 1:
+            return False
+        self.credit -= 1
+        return True
+
+    def offered(self, size):
+        self.offered_bytes += size
+        self.offered_frames += 1
+
+    def measure(self, stats, now):
+        """Re-caps the rate from the connection's stats once a window has elapsed.
+
+        Returns True if the rate changed.
+        """
+        if self.window_start is None:
+            self.window_start = now
+        elapsed = now - self.window_start
+        if elapsed < constants.SEND_RATE_WINDOW:
+            return False
+
+        drained = stats["sent_bytes"] - self.last_sent_bytes
+        dropped = stats["dropped"] - self.last_dropped
+        old_rate = self.rate
+        if (dropped or stats["depth"] > 1) and self.offered_frames:
+            frame_size = self.offered_bytes / self.offered_frames
+            self.rate = drained / elapsed / frame_size
+        else:
+            self.rate += constants.SEND_RATE_STEP
+        self.rate = max(constants.MIN_SEND_RATE, min(self.max_rate, self.rate))
+
+        self.window_start = now
+        self.offered_bytes = 0
+        self.offered_frames = 0
+        self.last_sent_bytes = stats["sent_bytes"]
+        self.last_dropped = stats["dropped"]
+        return round(self.rate) != round(old_rate)
+
+
+class Connection:
+    """A non-blocking client socket owned by the event loop."""
+
+    def __init__(self, sock, addr):
+        self.sock = sock
+        self.addr = addr
+        self.sock.setblocking(False)
+
+        self.reader = FrameReader(sock)  # Received bytes, including partial frames
+        self.out_buffer = b""  # Remainder of the frame currently being written
+        self.queue = SendQueue()
+        self.closed = False
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def read_messages(self):
+        """Reads whatever is available and returns every complete decoded message."""
+        try:
+            received = self.reader.fill()
+        except (BlockingIOError, InterruptedError):
+            return []
+        if not received:
+            raise ConnectionError("Connection lost while receiving message.")
+        return self.decode_buffered()
+
+    def decode_buffered(self):
+        """Returns every complete decoded message already in the input buffer."""
+        return [msgpack.unpackb(frame) for frame in self.reader.frames()]
+
+    def sendall(self, data):
+        """Queues a control frame and writes as much as the socket will take right now."""
+        self.queue.put(data)
+        self.flush()
+
+    def send_state(self, data, state, pack=pack_frame, trailer=b""):
+        """Queues a STATE frame that may be merged away if the client is lagging."""
+        self.queue.put(data, state, pack, trailer)
+        self.flush()
+
+    def pending(self):
+        return bool(self.out_buffer) or len(self.queue) > 0
+
+    def flush(self):
+        while True:
+            if not self.out_buffer:
+                self.out_buffer = self.queue.get(block=False)
+                if self.out_buffer is None:
+                    self.out_buffer = b""
+                    return
+            try:
+                sent = self.sock.send(self.out_buffer)
+            except (BlockingIOError, InterruptedError):
+                return
+            self.out_buffer = self.out_buffer[sent:]
+
+    def stats(self):
+        return self.queue.stats()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            try:
+                self.flush()  # Best effort for goodbye messages
+            except OSError:
+                pass
+            self.queue.close()
+            self.sock.close()
+
+
+class ThreadedConnection:
+    """A blocking client socket whose frames are written by its own writer thread."""
+
+    def __init__(self, sock, addr):
+        self.sock = sock
+        self.addr = addr
+        self.queue = SendQueue()
+        self.closed = False
+
+        self.writer = threading.Thread(target=self.write_loop)
+        self.writer.daemon = True
+        self.writer.start()
+
+    def sendall(self, data):
+        """Queues a control frame for the writer thread."""
+        self.queue.put(data)
+
+    def send_state(self, data, state, pack=pack_frame, trailer=b""):
+        """Queues a STATE frame that may be merged away if the client is lagging."""
+        self.queue.put(data, state, pack, trailer)
+
+    def write_loop(self):
+        try:
+            while True:
+                data = self.queue.get()
+                if data is None:
+                    break
+                self.sock.sendall(data)
+        except OSError as e:
+            print(f"Failed to send to {self.addr}: {e}")
+        finally:
+            self.closed = True
+            self.queue.close()
+            self.shutdown(socket.SHUT_RDWR)  # Wakes the reader thread
+            self.sock.close()
+
+    def stats(self):
+        return self.queue.stats()
+
+    def shutdown(self, how):
+        try:
+            self.sock.shutdown(how)
+        except OSError:
+            pass
+
+    def close(self):
+        """Stops reading at once and lets the writer drain what is already queued.
+
+        A writer still blocked on a client that stopped reading is cut off after
+        CLOSE_TIMEOUT, so its thread exits too.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.close()
+        self.shutdown(socket.SHUT_RD)
+
+        timer = threading.Timer(constants.CLOSE_TIMEOUT, self.shutdown, (socket.SHUT_RDWR,))
+        timer.daemon = True
+        timer.start()
+
+
+class NetworkCore:
+    """Single-threaded selector loop that owns the listening socket and every client."""
+
+    def __init__(self, server_socket, on_connect, on_message, on_disconnect):
+        self.selector = selectors.DefaultSelector()
+
+        # None when clients are handed over by add() instead of accepted here
+        self.server_socket = server_socket
+        if self.server_socket is not None:
+            self.server_socket.setblocking(False)
+            self.selector.register(self.server_socket, selectors.EVENT_READ, None)
+
+        # Callbacks into the game, all invoked from the thread calling poll()
+        self.on_connect = on_connect  # (conn) -> client or None to refuse
+        self.on_message = on_message  # (client, message) -> False to disconnect
+        self.on_disconnect = on_disconnect  # (client)
+
+        self.clients = {}  # Connection -> client object returned by on_connect
+
+    def poll(self, timeout):
+        """Waits up to timeout seconds for socket activity and dispatches it."""
+        self.sweep_closed()
+
+        for conn in self.clients:
+            events = selectors.EVENT_READ
+            if conn.pending():
+                events |= selectors.EVENT_WRITE
+            self.selector.modify(conn, events, conn)
+
+        for key, mask in self.selector.select(timeout):
+            if key.data is None:
+                self.accept()
+                continue
+            if not isinstance(key.data, Connection):
+                try:
+                    key.data()  # Watched socket callback
+                except Exception as e:
+                    print(f"Error in watched socket callback: {e}")
+                continue
+
+            conn = key.data
+            if conn.closed:
+                continue
+
+            try:
+                if mask & selectors.EVENT_WRITE:
+                    conn.flush()
+                if mask & selectors.EVENT_READ:
+                    for message in conn.read_messages():
+                        if self.on_message(self.clients[conn], message) is False:
+                            conn.close()
+                            break
+            except Exception as e:
+                print(f"Error with client {conn.addr}: {e}")
+                conn.close()
+
+        self.sweep_closed()
+
+    def accept(self):
+        try:
+            sock, addr = self.server_socket.accept()
+        except (BlockingIOError, InterruptedError):
+            return
+        self.add(sock, addr)
+
+    def add(self, sock, addr):
+        """Takes over a connected client socket, returns its Connection or None if refused."""
+        conn = Connection(sock, addr)
+        client = self.on_connect(conn)
+        if client is None:
+            conn.close()
+            return None
+
+        self.sweep_closed()  # A connection closed earlier this poll may still hold the reused fd
+        self.clients[conn] = client
+        self.selector.register(conn, selectors.EVENT_READ, conn)
+        return conn
+
+    def watch(self, sock, callback):
+        """Calls callback() from poll() whenever sock is readable."""
+        self.selector.register(sock, selectors.EVENT_READ, callback)
+
+    def sweep_closed(self):
+        """Unregisters connections closed since the last poll and reports them."""
+        for conn in [c for c in self.clients if c.closed]:
+            self.selector.unregister(conn)
+            self.on_disconnect(self.clients.pop(conn))
+
+    def close(self):
+        for conn in list(self.clients):
+            conn.close()
+        self.sweep_closed()
+        self.selector.close()
@@ -0,0 +1,276 @@
+# Batched player physics: one NumPy pass steps the players of every running room.
+# Results match Player.update bit for bit, float math runs in the same order on float64.
+from contextlib import ExitStack
+from shared import constants
+from .geometry import Rect, Vector2
+
+try:
+    import numpy as np
+except ImportError:  # Optional, servers without NumPy step players one by one
+    np = None
+
+GROUND = 1
+PLATFORM = 2
+GOAL = 3
+
+
+def available():
+    return np is not None
+
+
+def round_half_away(values):
+    """Rounds like the Rect setters, half away from zero."""
+    return np.where(
+        values >= 0, np.floor(values + 0.5), -np.floor(-values + 0.5)
+    ).astype(np.int64)
+
+
+class BatchPhysics:
+    """Steps every running room's players in one vectorized pass per tick.
+
+    Tiles are looked up in a stacked array of each map's tile types, so a
+    player's first ground, platform and goal cell is found the same way
+    TileGrid.first_contact() finds it. Platform occupancy depends on the
+    order players move in, so that part runs per player afterwards, in
+    room order, for the few players touching a platform.
+    """
+
+    def __init__(self, tile_size=constants.TILE_SIZE):
+        self.tile_size = tile_size
+        self.map_index = {}  # id(map) -> index into grids
+        self.maps = []  # Keeps indexed maps alive so their ids stay unique
+        self.grids = np.zeros((0, constants.GRID_HEIGHT, constants.GRID_WIDTH), np.int8)
+
+    def grid_index(self, map):
+        """Returns the index of a tile map's type grid, adding it the first time it is seen."""
+        index = self.map_index.get(id(map))
+        if index is None:
+            grid = np.zeros((1, constants.GRID_HEIGHT, constants.GRID_WIDTH), np.int8)
+            for row, cells in enumerate(map[: constants.GRID_HEIGHT]):
+                grid[0, row, : len(cells)] = cells[: constants.GRID_WIDTH]
+            index = len(self.maps)
+            self.maps.append(map)
+            self.map_index[id(map)] = index
+            self.grids = np.concatenate((self.grids, grid))
+        return index
+
+    def update(self, rooms, ticks):
+        """Advances every room by ticks like Room.update(), simulating all of them together."""
+        running = [room for room in rooms if room.start_update(ticks)]
+        ended = set()
+        for _ in range(ticks):
+            active = [room for room in running if room not in ended and room.winner is None]
+            if not active:
+                break
+            ended.update(self.simulate_tick(active))
+        for room in running:
+            room.finish_update(ticks, room in ended)
+
+    def simulate_tick(self, rooms):
+        """Runs one tick in every room, returns the rooms that have no players left."""
+        with ExitStack() as stack:
+            for room in rooms:
+                stack.enter_context(room.lock)
+
+            batch = []  # (room, players)
+            empty = []
+            for room in rooms:
+                players = room.begin_tick()
+                if players:
+                    batch.append((room, players))
+                else:
+                    empty.append(room)
+
+            if batch:
+                self.step(batch)
+            for room, players in batch:
+                room.update_platforms()
+        return empty
+
+    def step(self, batch):
+        """Moves the players of (room, players) pairs, setting room.winner if one reached the goal."""
+        players = [player for room, room_players in batch for player in room_players]
+        grid = np.array(
+            [
+                self.grid_index(room.current_map["map"])
+                for room, room_players in batch
+                for _ in room_players
+            ]
+        )
+
+        state = np.array(
+            [
+                (
+                    player.position.x,
+                    player.position.y,
+                    player.velocity.x,
+                    player.velocity.y,
+                    player.rect.y,
+                    player.rect.width,
+                    player.rect.height,
+                    player.speed,
+                    player.in_air,
+                    -1 if player.direction == "left" else 1 if player.direction == "right" else 0,
+                    bool(player.jump),
+                    player.drag_vector.x,
+                    player.drag_vector.y,
+                )
+                for player in players
+            ]
+        )
+        px, py, vx, vy, speed, drag_x, drag_y = state[:, [0, 1, 2, 3, 7, 11, 12]].T
+        ry, rw, rh, direction = state[:, [4, 5, 6, 9]].T.astype(np.int64)
+        in_air, jump = state[:, [8, 10]].T.astype(bool)
+        rb = ry + rh
+
+        # Movement and jumping
+        vx = np.where(direction < 0, -speed, np.where(direction > 0, speed, np.where(in_air, vx, 0.0)))
+        inverse = 1 / 10  # Vector2 divides by multiplying with the reciprocal
+        ax = np.where(jump, drag_x * inverse, 0.0)
+        ay = np.where(jump, drag_y * inverse, constants.Y_GRAVITY)
+        in_air = in_air | jump
+
+        vx = vx + ax * constants.Y_GRAVITY
+        vy = vy + ay * constants.Y_GRAVITY
+        nx = (px + vx) + 0.5 * ax
+        ny = (py + vy) + 0.5 * ay
+        goal_state = (vx.copy(), vy.copy(), ax.copy(), ay.copy(), in_air.copy())
+
+        # Next rect and the first cell of each kind it overlaps
+        nl = round_half_away(nx)
+        nt = round_half_away(ny) - rh
+        nr = nl + rw
+        nb = nt + rh
+        ground, ground_row, ground_col = self.first_cells(grid, GROUND, nl, nt, nr, nb)
+        platform, platform_row, platform_col = self.first_cells(grid, PLATFORM, nl, nt, nr, nb)
+        goal = self.first_cells(grid, GOAL, nl, nt, nr, nb)[0]
+
+        in_air = in_air | (~ground & ~platform)
+
+        # Ground, then platform collision
+        for hit, row, col in ((ground, ground_row, ground_col), (platform, platform_row, platform_col)):
+            left = col * self.tile_size
+            top = row * self.tile_size
+            right = left + self.tile_size
+            bottom = top + self.tile_size
+
+            beside = (rb > top + 1) & (ry < bottom - 1)
+            hit_left = hit & (vx > 0) & (nr > left) & beside
+            hit_right = hit & ~hit_left & (vx < 0) & (nl < right) & beside
+            hit_top = hit & (vy > 0) & (nb > top) & (rb < top + 1)
+            hit_bottom = hit & ~hit_top & (vy < 0) & (nt < bottom) & (ry > bottom - 1)
+
+            nx = np.where(hit_left, left - rw, np.where(hit_right, right, nx))
+            vx = np.where(hit_left | hit_right, 0.0, vx)
+            ax = np.where(hit_left | hit_right, 0.0, ax)
+            ny = np.where(hit_top, top, np.where(hit_bottom, bottom + rh, ny))
+            vy = np.where(hit_top | hit_bottom, 0.0, vy)
+            ay = np.where(hit_top | hit_bottom, 0.0, ay)
+            in_air = in_air & ~hit_top
+
+            if hit is ground:
+                ground_vy = vy  # Occupancy checks see velocity after ground collision
+                ground_in_air = in_air
+
+        # Screen borders, only the first that applies
+        past_left = nx < 0
+        past_right = ~past_left & (nx + rw > constants.SCREEN_WIDTH)
+        past_top = ~past_left & ~past_right & (ny < 0)
+        past_bottom = ~past_left & ~past_right & ~past_top & (nb > constants.SCREEN_HEIGHT)
+        nx = np.where(past_left, 0.0, np.where(past_right, constants.SCREEN_WIDTH - rw, nx))
+        vx = np.where(past_left | past_right, 0.0, vx)
+        ax = np.where(past_left | past_right, 0.0, ax)
+        ny = np.where(past_top, 0.0, ny)
+        vy = np.where(past_top, 0.0, vy)
+        ay = np.where(past_top, 0.0, ay)
+
+        # Back to the players, in room order
+        rect_x = round_half_away(nx)
+        rect_y = round_half_away(ny) - rh
+        columns = [
+            array.tolist()
+            for array in (
+                nx, ny, vx, vy, ax, ay, in_air, rect_x, rect_y,
+                nl, nt, nb, rb, ground_vy, ground_in_air,
+            )
+        ]
+        moved = list(zip(*columns))
+        goal_state = list(zip(*(array.tolist() for array in goal_state)))
+        goal = goal.tolist()
+        platform = platform.tolist()
+        past_bottom = past_bottom.tolist()
+
+        start = 0
+        for room, room_players in batch:
+            spawn = room.current_map["spawn"]
+            for i, player in enumerate(room_players, start):
+                if goal[i]:
+                    velocity_x, velocity_y, acceleration_x, acceleration_y, player.in_air = goal_state[i]
+                    player.velocity = Vector2(velocity_x, velocity_y)
+                    player.acceleration = Vector2(acceleration_x, acceleration_y)
+                    player.direction = None
+                    player.jump = None
+                    room.winner = player
+                    break  # Later players don't move this tick
+
+                (x, y, velocity_x, velocity_y, acceleration_x, acceleration_y, in_air, rect_x, rect_y,
+                 left, top, bottom, old_bottom, occupancy_vy, occupancy_in_air) = moved[i]
+
+                if platform[i] and not self.occupy_platforms(
+                    room, player, Rect(left, top, player.rect.width, bottom - top), occupancy_vy, old_bottom
+                ):
+                    player.in_air = occupancy_in_air
+                    player.reset_position(spawn)
+                    continue
+
+                player.in_air = in_air
+                if past_bottom[i]:
+                    player.reset_position(spawn)
+                    continue
+
+                player.position = Vector2(x, y)
+                player.rect.x = rect_x  # Same rounding as rect.bottomleft = position
+                player.rect.y = rect_y
+                player.velocity = Vector2(velocity_x, velocity_y)
+                player.acceleration = Vector2(acceleration_x, acceleration_y)
+                player.direction = None
+                player.jump = None
+            start += len(room_players)
+
+    def occupy_platforms(self, room, player, next_rect, velocity_y, old_bottom):
+        """Claims platforms the player lands on, returns False if one is held by another player."""
+        for tile in room.tile_grid.colliding("platform", next_rect):
+            if tile.occupied_by is not None and tile.occupied_by != player.color:
+                return False
+            if (
+                velocity_y > 0
+                and next_rect.bottom > tile.rect.top
+                and old_bottom < tile.rect.top + 1
+            ):
+                room.tile_grid.occupy(tile, player.color)
+        return True
+
+    def first_cells(self, grid, kind, left, top, right, bottom):
+        """Returns (found, row, col) of the first cell of a kind each rect overlaps, in row-major order."""
+        size = self.tile_size
+        first_row = top // size
+        first_col = left // size
+        last_row = (bottom - 1) // size
+        last_col = (right - 1) // size
+        height, width = self.grids.shape[1:]
+
+        found = np.zeros(len(grid), bool)
+        found_row = np.zeros(len(grid), np.int64)
+        found_col = np.zeros(len(grid), np.int64)
+        for dr in range(int((last_row - first_row).max()) + 1):
+            row = first_row + dr
+            for dc in range(int((last_col - first_col).max()) + 1):
+                col = first_col + dc
+                inside = (row <= last_row) & (col <= last_col)
+                inside &= (row >= 0) & (row < height) & (col >= 0) & (col < width)
+                cells = self.grids[grid, np.clip(row, 0, height - 1), np.clip(col, 0, width - 1)]
+                hit = inside & (cells == kind) & ~found
+                found_row = np.where(hit, row, found_row)
+                found_col = np.where(hit, col, found_col)
+                found |= hit
+        return found, found_row, found_col
@@ -1,39 +1,64 @@
-import pygame
+from collections import deque
 from shared import constants
+from .geometry import Rect, Vector2
 
 
-class Player(pygame.sprite.Sprite):
-    def __init__(self, color, spawn, width, height):
-        super().__init__()
+class Player:
+    # Slots keep per-player memory and attribute lookups down, rooms hold many players
+    __slots__ = (
+        "color", "rect", "position", "speed", "velocity", "acceleration",
+        "in_air", "drag_vector",
+        "conn", "addr", "room", "snapshot_format", "send_rate", "sent_seq",
+        "acked_seq", "ack_floor", "broadcast_state", "changed_at",
+        "inputs", "input_seq", "input_ticks", "sent_input_ack",
+        "buttons", "direction", "jump", "wins",
+    )
 
-        # Load image
+    def __init__(self, color, spawn, width, height):
         self.color = color
-        self.image = pygame.Surface([width, height])
 
         # Position and Rect
         x = spawn[0]
         y = spawn[1]
-        self.rect = self.image.get_rect()
+        self.rect = Rect(0, 0, width, height)
         self.rect.bottomleft = (x, y)
-        self.position = pygame.math.Vector2(x, y)
+        self.position = Vector2(x, y)
 
         # Movement
         self.speed = 3 * constants.Y_GRAVITY
-        self.velocity = pygame.math.Vector2(0, 0)
-        self.acceleration = pygame.math.Vector2(
+        self.velocity = Vector2(0, 0)
+        self.acceleration = Vector2(
             0, 0
         )  # To be used for Jumping and Gravity only
 
         # Jumping
         self.in_air = False
-        self.max_fall_speed = 10
-        self.drag_vector = pygame.math.Vector2(0, 0)
+        self.drag_vector = Vector2(0, 0)
 
         # Server side stuff
         self.conn = None
         self.addr = None
+        self.room = None  # Room the player joined
+        self.snapshot_format = "msgpack"  # STATE encoding negotiated by the client
+        self.send_rate = None  # SendRate, set when the client connects
+        self.sent_seq = 0  # Snapshot sequence of the last STATE queued to the client
+
+        # Delta snapshots
+        self.acked_seq = None  # Newest snapshot the client acknowledged, None forces a keyframe
+        self.ack_floor = 0  # Acks for older snapshots are stale and ignored
+        self.broadcast_state = None  # (x, y, in_air) at the previous broadcast
+        self.changed_at = [0, 0, 0]  # Snapshot sequence each field last changed in
+
+        # Input acknowledgement for client-side prediction
+        # (seq, buttons, jump) INPUTs appended by the network thread and drained by the tick,
+        # bounded since players in the waiting room aren't simulated
+        self.inputs = deque(maxlen=4 * constants.INPUT_QUEUE_LIMIT)
+        self.input_seq = 0  # Input sequence the simulation has picked up
+        self.input_ticks = 0  # Ticks simulated since input_seq was picked up
+        self.sent_input_ack = None  # (seq, state) of the last INPUT ACK sent
 
         # Server Tags
+        self.buttons = 0  # Buttons held in the client's last INPUT, kept until it sends a change
         self.direction = None
         self.jump = False
 
@@ -44,15 +69,72 @@ class Player(pygame.sprite.Sprite):
         self.position.x = Coordinates[0]
         self.position.y = Coordinates[1]
         self.rect.bottomleft = self.position
-        self.velocity = pygame.math.Vector2(0, 0)
-        self.acceleration = pygame.math.Vector2(0, 0)
+        self.velocity = Vector2(0, 0)
+        self.acceleration = Vector2(0, 0)
         self.direction = None
         self.jump = False
 
+    def reset_baseline(self, seq):
+        """Forces a delta keyframe, ignoring acks for snapshots before seq."""
+        self.acked_seq = None
+        self.ack_floor = seq
+
+    def track_changes(self, seq):
+        """Stamps fields that changed since the previous broadcast with seq."""
+        state = (self.position.x, self.position.y, self.in_air)
+        if self.broadcast_state is None:
+            self.changed_at = [seq, seq, seq]
+        else:
+            for i in range(3):
+                if state[i] != self.broadcast_state[i]:
+                    self.changed_at[i] = seq
+        self.broadcast_state = state
+
+    def consume_input(self):
+        """Applies the next queued INPUT and counts one tick against it, call once per tick before update().
+
+        One INPUT is applied per tick, in the order they arrived, so two sent in
+        the same tick play out over two ticks. If more than INPUT_QUEUE_LIMIT
+        are waiting the oldest are skipped, keeping the newest jump among them.
+        """
+        if self.inputs:
+            seq, self.buttons, jump = self.inputs.popleft()
+            while len(self.inputs) > constants.INPUT_QUEUE_LIMIT:
+                seq, self.buttons, newer_jump = self.inputs.popleft()
+                if newer_jump is not None:
+                    jump = newer_jump
+            if jump is not None:
+                self.jump = True
+                self.drag_vector = Vector2(*jump)
+            if seq != self.input_seq:
+                self.input_seq = seq
+                self.input_ticks = 0
+        self.input_ticks += 1
+
+        if self.buttons == constants.INPUT_LEFT:
+            self.direction = "left"
+        elif self.buttons == constants.INPUT_RIGHT:
+            self.direction = "right"
+
+    def input_ack(self):
+        """Returns the INPUT ACK the client reconciles its predicted player against."""
+        return {
+            "type": "INPUT ACK",
+            "seq": self.input_seq,
+            "ticks": self.input_ticks,
+            "state": [
+                self.position.x,
+                self.position.y,
+                self.velocity.x,
+                self.velocity.y,
+                self.in_air,
+            ],
+        }
+
     def update(
-        self, tile_groups, spawn, check_goal=True
+        self, tile_grid, spawn, check_goal=True
     ):  # returns True if player reaches goal
-        self.acceleration = pygame.math.Vector2(0, constants.Y_GRAVITY)
+        self.acceleration = Vector2(0, constants.Y_GRAVITY)
 
         # Movement (Left, Right) (No acceleration) (No moving while jumping or dragging)
         if self.direction == "left":
@@ -82,75 +164,57 @@ class Player(pygame.sprite.Sprite):
         next_rect = self.rect.copy()
         next_rect.bottomleft = next_position
 
-        # Collision detection for next position
-        touched_ground = pygame.sprite.spritecollide(
-            self,
-            tile_groups["ground"],
-            False,
-            collided=lambda sprite, tile: next_rect.colliderect(tile.rect),
-        )
-        touched_platform = pygame.sprite.spritecollide(
-            self,
-            tile_groups["platform"],
-            False,
-            collided=lambda sprite, tile: next_rect.colliderect(tile.rect),
-        )
+        # Collision detection for next position, only the cells next_rect covers are checked
+        ground = tile_grid.first_contact("ground", next_rect)  # Cell rect of the first ground hit
+        touched_platform = tile_grid.colliding("platform", next_rect)
 
         if check_goal:
             # Check if player reached the goal
-            touched_goal = pygame.sprite.spritecollide(
-                self,
-                tile_groups["goal"],
-                False,
-                collided=lambda sprite, tile: next_rect.colliderect(tile.rect),
-            )
-            if touched_goal:
+            if tile_grid.first_contact("goal", next_rect) is not None:
                 return True
 
-        if not touched_ground and not touched_platform:
+        if ground is None and not touched_platform:
             self.in_air = True
 
         # Ground Collision
-        if touched_ground:
-
-            tile = touched_ground[0]
+        if ground is not None:
 
             # Horizontal Collision
             if (
                 self.velocity.x > 0
-                and next_rect.right > tile.rect.left
-                and self.rect.bottom > tile.rect.top + 1
-                and self.rect.top < tile.rect.bottom - 1
+                and next_rect.right > ground.left
+                and self.rect.bottom > ground.top + 1
+                and self.rect.top < ground.bottom - 1
             ):  # Left Side Collision
-                next_position.x = tile.rect.left - self.rect.width
+                next_position.x = ground.left - self.rect.width
                 self.velocity.x = 0
                 self.acceleration.x = 0
             elif (
                 self.velocity.x < 0
-                and next_rect.left < tile.rect.right
-                and self.rect.bottom > tile.rect.top + 1
-                and self.rect.top < tile.rect.bottom - 1
+                and next_rect.left < ground.right
+                and self.rect.bottom > ground.top + 1
+                and self.rect.top < ground.bottom - 1
             ):  # Right Side Collision
-                next_position.x = tile.rect.right
+                next_position.x = ground.right
                 self.velocity.x = 0
                 self.acceleration.x = 0
 
             # Vertical Collision
             if (
                 self.velocity.y > 0
-                and next_rect.bottom > tile.rect.top
-                and self.rect.bottom < tile.rect.top + 1
+                and next_rect.bottom > ground.top
+                and self.rect.bottom < ground.top + 1
             ):  # Top Side Collision
-                next_position.y = tile.rect.top
+                next_position.y = ground.top
                 self.velocity.y = 0
                 self.acceleration.y = 0
                 self.in_air = False
             elif (
                 self.velocity.y < 0
-                and next_rect.top < tile.rect.bottom
-                and self.rect.top > tile.rect.bottom - 1
+                and next_rect.top < ground.bottom
+                and self.rect.top > ground.bottom - 1
             ):  # Bottom Side Collision
-                next_position.y = tile.rect.bottom + self.rect.height
+                next_position.y = ground.bottom + self.rect.height
                 self.velocity.y = 0
                 self.acceleration.y = 0
 
@@ -170,7 +234,7 @@ class Player(pygame.sprite.Sprite):
                         and next_rect.bottom > tile.rect.top
                         and self.rect.bottom < tile.rect.top + 1
                     ):  # Make sure player is on top of platform
-                        tile.occupied_by = self.color
+                        tile_grid.occupy(tile, self.color)
 
             tile = touched_platform[0]
 
@@ -0,0 +1,683 @@
+import msgpack
+import threading
+import random
+import string
+import time
+from shared import constants, maps, snapshot
+from .tile import Tile
+from .player import Player
+from .collision import TileGrid, merge_solid_cells
+from .geometry import Group
+from .network import SendRate, pack_frame, pack_snapshot_frame
+from . import tilemaps
+
+
+def new_room_code(taken):
+    """Returns a random room code that is not in taken."""
+    while True:
+        code = "".join(
+            random.choices(
+                string.ascii_uppercase + string.digits, k=constants.ROOM_CODE_LENGTH
+            )
+        )
+        if code not in taken:
+            return code
+
+
+class Room:
+    """One match: its own map, players, ready set and tick state.
+
+    Rooms never block, the GameServer's scheduler calls update() on every room
+    once per frame with the number of ticks that are due.
+    """
+
+    def __init__(self, code):
+        self.code = code
+
+        self.sprite_groups = {
+            "platform": Group(),  # Used for Collision and Occupancy
+            "players": Group(),  # Used for Collision and Broadcasting
+            "waiting-players": Group(),  # Used for Waiting Room
+        }
+
+        self.lock = threading.Lock()
+
+        # Player Colors
+        self.unused_colors = list(constants.PLAYER_COLORS)  # 8 Players, should be fine
+        self.used_colors = []
+
+        # Player Waiting Room Locations
+        self.waiting_room_locations = [ (128, 160), (256, 160), (384, 160), (512, 160),
+                                        (128, 280), (256, 280), (384, 280), (512, 280),
+                                      ]  # List of (x, y) coordinates for players to be placed in the waiting room
+        self.used_waiting_room_locations = []
+
+        # Tilemap
+        self.tile_size = constants.TILE_SIZE
+        self.tile_grid = TileGrid(self.tile_size)  # Collision index, rebuilt every round
+        self.changed_tiles = []  # tile changes simulated since the last broadcast
+        self.tile_data = []  # used for sending of tile map to clients
+
+        # Broadcast rate
+        self.send_credit = 0  # Fraction of a STATE broadcast earned by the ticks simulated so far
+
+        # Ticks the room has run, STATE frames carry it so clients can time snapshots
+        self.tick = 0
+
+        # Delta snapshots
+        self.snapshot_seq = 0  # Sequence number of the latest broadcast
+        self.tile_changed_at = {}  # (x, y) -> (color, seq) for platform tiles changed this round
+        self.presence = {"players": set(), "waiting-players": set()}  # colors at last broadcast
+        self.presence_changed_at = {"players": 0, "waiting-players": 0}
+
+        self.game_maps = [tilemaps.game_1, tilemaps.game_2]
+        self.current_map = None
+        self.map_hash = None  # Content hash of the current map, NEW GAME only sends this
+        self.map_frame = None  # Full map for clients that don't have it cached
+
+        # Game Logic
+        self.winner = None
+        self.waiting = True  # Waiting Room
+        self.game_running = False  # Game Running
+        self.ready = []  # Ready Players
+        self.countdown_value = None  # Next COUNTDOWN to send, None when not counting down
+        self.countdown_at = 0  # time.monotonic() the next COUNTDOWN is due
+
+    def is_full(self):
+        return not self.unused_colors
+
+    def is_empty(self):
+        return not self.used_colors
+
+    def add_player(self, conn, addr):
+        """Adds a new connection as a waiting player, the room must not be full."""
+        color = self.get_color()
+        location = self.get_waiting_room_location()
+        player = Player(color, location, self.tile_size, self.tile_size)
+        player.conn = conn  # Store connection for broadcasting
+        player.addr = addr  # Store address
+        player.room = self
+        player.send_rate = SendRate()
+
+        with self.lock:
+            self.sprite_groups["waiting-players"].add(player)
+
+        # Send waiting room game state
+        initial_state = {
+            "type": "INITIAL",
+            "Players": self.get_player_state(waiting=True),
+            "YourPlayer": player.color,
+            "Room": self.code,
+            "SnapshotFormats": snapshot.FORMATS,
+        }
+        conn.sendall(pack_frame(initial_state))
+        return player
+
+    def create_tile_map(self, map, waiting=False):
+        """Creates the tile map based on the given 2D array."""
+        self.tile_data = []
+        self.changed_tiles = []
+        self.tile_changed_at = {}
+        self.tile_grid.clear()
+        for row in range(len(map)):
+            for col in range(len(map[row])):
+                x = col * self.tile_size
+                y = row * self.tile_size
+
+                # Ground
+                if map[row][col] == 1:
+                    self.tile_data.append({"x": x, "y": y, "type": 1})
+
+                # Platform
+                elif map[row][col] == 2:
+                    tile = Tile(
+                        x,
+                        y,
+                        self.tile_size,
+                        self.tile_size,
+                        2,
+                        self.sprite_groups["platform"],
+                    )
+                    self.tile_grid.add("platform", tile)
+                    self.tile_data.append({"x": x, "y": y, "type": 2})
+
+                # Goal
+                elif map[row][col] == 3:
+                    self.tile_data.append({"x": x, "y": y, "type": 3})
+
+        # Ground and goal carry no per-tile state, physics only needs merged rects
+        for kind, tile_type in (("ground", 1), ("goal", 3)):
+            for block in merge_solid_cells(map, tile_type):
+                self.tile_grid.add_solid(kind, *block)
+
+    def handle_message(self, player, player_data):
+        """Applies one decoded client message, returns False when the client disconnects."""
+
+        # Handle disconnect input
+        if player_data["type"] == "DISCONNECT":
+            player.conn.sendall(pack_frame("DISCONNECTED"))
+            return False
+
+        # Handle STATE encoding negotiation
+        elif player_data["type"] == "FORMAT":
+            if player_data["format"] in snapshot.FORMATS:
+                player.snapshot_format = player_data["format"]
+            else:
+                print(f"Invalid snapshot format: {player_data['format']}")
+
+        # Handle delta snapshot acknowledgement
+        elif player_data["type"] == "ACK":
+            seq = player_data["seq"]
+            if seq >= player.ack_floor and (
+                player.acked_seq is None or seq > player.acked_seq
+            ):
+                player.acked_seq = seq
+
+        # Handle map download, clients ask when the round's map isn't in their cache
+        elif player_data["type"] == "MAP":
+            if player_data["hash"] == self.map_hash:
+                player.conn.sendall(self.map_frame)
+            else:
+                print(f"Client {player.addr} asked for unknown map {player_data['hash']}")
+
+        # Handle ready input
+        elif player_data["type"] == "READY":
+            if player not in self.ready:  # Avoid duplicate entries
+                self.ready.append(player)
+
+        # Handle input, queued for the tick and held until the next INPUT
+        elif player_data["type"] == "INPUT":
+            buttons = player_data["buttons"] & (constants.INPUT_LEFT | constants.INPUT_RIGHT)
+            jump = player_data.get("jump")
+            if jump is not None:
+                jump = (float(jump[0]), float(jump[1]))  # Bad vectors fail here, not in the tick
+            player.inputs.append((player_data["seq"], buttons, jump))
+
+        return True
+
+    def remove_player(self, player):
+        """Releases a disconnected player's color and waiting room spot."""
+        self.unused_colors.append(player.color)
+        self.used_colors.remove(player.color)
+        with self.lock:
+            if player in self.sprite_groups["players"]:
+                self.sprite_groups["players"].remove(player)
+            elif player in self.sprite_groups["waiting-players"]:
+                self.sprite_groups["waiting-players"].remove(player)
+                self.waiting_room_locations.append(player.rect.bottomleft)
+                self.used_waiting_room_locations.remove(player.rect.bottomleft)
+
+    def get_player_state(self, waiting=False):
+        players = []
+        if waiting:
+            players = [
+                {
+                    "x": p.position.x,
+                    "y": p.position.y,
+                    "color": p.color,
+                    "in_air": p.in_air,
+                }
+                for p in self.sprite_groups["waiting-players"]
+            ]
+        else:
+            players = [
+                {
+                    "x": p.position.x,
+                    "y": p.position.y,
+                    "color": p.color,
+                    "in_air": p.in_air,
+                }
+                for p in self.sprite_groups["players"]
+            ]
+        return players
+
+    def get_color(self):
+        if len(self.unused_colors) == 0:
+            return "Error: No more colors available"
+        color = self.unused_colors.pop(0)
+        self.used_colors.append(color)
+        return color
+
+    def get_waiting_room_location(self):
+        location = self.waiting_room_locations.pop(0)
+        self.used_waiting_room_locations.append(location)
+        return location
+
+    def get_player_snapshot(self, waiting=False):
+        """Player state as (color, x, y, in_air) tuples for binary snapshots."""
+        group = "waiting-players" if waiting else "players"
+        return [
+            (p.color, p.position.x, p.position.y, p.in_air)
+            for p in self.sprite_groups[group]
+        ]
+
+    def state_frame(self, waiting, snapshot_format, sent_seq):
+        """Encodes a STATE frame with tiles changed after sent_seq, returns (data, state, pack) for the send queue."""
+        tiles = None
+        if not waiting:
+            tiles = [
+                {"x": x, "y": y, "color": color}
+                for (x, y), (color, seq) in self.tile_changed_at.items()
+                if seq > sent_seq
+            ]
+        if snapshot_format == "binary":
+            state = {
+                "tick": self.tick,
+                "players": self.get_player_snapshot(waiting),
+                "tiles": tiles,
+            }
+            return pack_snapshot_frame(state), state, pack_snapshot_frame
+
+        state = {
+            "type": "STATE",
+            "tick": self.tick,
+            "players": self.get_player_state(waiting),
+            "tiles": tiles,
+        }
+        return pack_frame(state), state, pack_frame
+
+    def track_changes(self):
+        """Stamps player fields, tiles and group membership that changed with the new sequence."""
+        self.snapshot_seq += 1
+        for group in self.presence:
+            colors = set()
+            for player in self.sprite_groups[group]:
+                player.track_changes(self.snapshot_seq)
+                if player.color not in self.presence[group]:
+                    player.changed_at = [self.snapshot_seq] * 3  # New to the group, send every field
+                colors.add(player.color)
+            if colors != self.presence[group]:
+                self.presence[group] = colors
+                self.presence_changed_at[group] = self.snapshot_seq
+
+        for tile in self.changed_tiles:
+            self.tile_changed_at[(tile["x"], tile["y"])] = (tile["color"], self.snapshot_seq)
+        self.changed_tiles = []
+
+    def delta_frame(self, waiting, acked_seq):
+        """Encodes a delta STATE against acked_seq, returns None if the client is up to date."""
+        group = "waiting-players" if waiting else "players"
+        keyframe = (
+            acked_seq is None
+            or self.snapshot_seq - acked_seq > constants.DELTA_MAX_AGE
+        )
+
+        players = []
+        for p in self.sprite_groups[group]:
+            x, y, in_air = p.broadcast_state
+            if not keyframe:
+                changed_x, changed_y, changed_in_air = p.changed_at
+                x = x if changed_x > acked_seq else None
+                y = y if changed_y > acked_seq else None
+                in_air = in_air if changed_in_air > acked_seq else None
+                if x is None and y is None and in_air is None:
+                    continue
+            players.append((p.color, x, y, in_air))
+
+        tiles = []
+        if waiting:
+            pass
+        elif keyframe:
+            tiles = [
+                (tile.rect.x, tile.rect.y, tile.color)
+                for tile in self.sprite_groups["platform"]
+            ]
+        else:
+            tiles = [
+                (x, y, color)
+                for (x, y), (color, seq) in self.tile_changed_at.items()
+                if seq > acked_seq
+            ]
+
+        if (
+            not keyframe
+            and not players
+            and not tiles
+            and self.presence_changed_at[group] <= acked_seq
+        ):
+            return None
+
+        payload = snapshot.encode_delta(
+            self.snapshot_seq, self.tick, keyframe, self.presence[group], players, tiles
+        )
+        data = len(payload).to_bytes(4, byteorder="big") + payload
+        return data, {"seq": self.snapshot_seq}, pack_frame  # No tiles to carry, newer deltas supersede
+
+    def send_due(self, ticks):
+        """Earns SEND_RATE / TICK_RATE of a broadcast per tick, returns True once one is due."""
+        self.send_credit += ticks * constants.SEND_RATE / constants.TICK_RATE
+        if self.send_credit < 1:
+            return False
+        self.send_credit = min(self.send_credit - 1, 1)
+        return True
+
+    def broadcast(self):
+        """Broadcasts game state to all connected clients, skipping those over their send rate"""
+        frames = {}  # (waiting, snapshot format, baseline) -> frame, each encoded at most once
+        now = time.monotonic()
+
+        with self.lock:
+            self.track_changes()
+
+            for group, waiting in (("players", False), ("waiting-players", True)):
+                for player in self.sprite_groups[group]:
+                    if player.conn.closed:
+                        continue  # Waiting for remove_player()
+                    if player.send_rate.measure(player.conn.stats(), now):
+                        print(
+                            f"Client {player.addr} ({player.color}) send rate "
+                            f"now {player.send_rate.rate:.0f}/s"
+                        )
+                    if not player.send_rate.due():
+                        continue  # Skipped clients catch up on the next STATE they get
+
+                    if player.snapshot_format == "delta":
+                        key = (waiting, "delta", player.acked_seq)
+                        if key not in frames:
+                            frames[key] = self.delta_frame(waiting, player.acked_seq)
+                    else:
+                        baseline = None if waiting else player.sent_seq
+                        key = (waiting, player.snapshot_format, baseline)
+                        if key not in frames:
+                            frames[key] = self.state_frame(
+                                waiting, player.snapshot_format, player.sent_seq
+                            )
+
+                    if frames[key] is None:
+                        continue  # Client already has this state
+                    data, state, pack = frames[key]
+
+                    # Players in a round get their own input ack riding along with the STATE,
+                    # the queue keeps it even if this STATE is merged into a newer one
+                    ack_frame = b""
+                    if not waiting:
+                        ack = player.input_ack()
+                        if (ack["seq"], ack["state"]) != player.sent_input_ack:
+                            ack_frame = pack_frame(ack)
+                            player.sent_input_ack = (ack["seq"], ack["state"])
+                    try:
+                        player.conn.send_state(data, state, pack, ack_frame)
+                        player.send_rate.offered(len(data) + len(ack_frame))
+                        player.sent_seq = self.snapshot_seq
+                    except:
+                        print(f"Failed to send to {player.addr}")
+                        player.conn.close()  # remove_player() frees its color and spot once the disconnect is seen
+
+    def connection_stats(self):
+        """Returns outbound queue depth and drop counters for every player in the room."""
+        with self.lock:
+            players = list(self.sprite_groups["players"]) + list(
+                self.sprite_groups["waiting-players"]
+            )
+        return [
+            {
+                "room": self.code,
+                "color": p.color,
+                "addr": p.addr,
+                "send_rate": p.send_rate.rate,
+                **p.conn.stats(),
+            }
+            for p in players
+        ]
+
+    def countdown(self):
+        """Sends the next COUNTDOWN once it is due, the round starts after 0."""
+        if time.monotonic() < self.countdown_at:
+            return
+
+        message = msgpack.packb({"type": "COUNTDOWN", "value": self.countdown_value})
+        length_message = len(message).to_bytes(4, byteorder="big")
+        with self.lock:
+            for player in self.sprite_groups["players"]:
+                try:
+                    player.conn.sendall(length_message + message)
+                except:
+                    print(f"Failed to send to {player.addr}")
+                    player.conn.close()  # remove_player() takes it out once the disconnect is seen
+
+        if self.countdown_value == 0:
+            self.countdown_value = None
+        else:
+            self.countdown_value -= 1
+            self.countdown_at += 1
+
+    def game_over(self):
+        """Handles the end of the game."""
+
+        # Send game over message
+        if self.winner is not None:
+            message = msgpack.packb({"type": "GAME OVER", "winner": self.winner.color})
+            length_message = len(message).to_bytes(4, byteorder="big")
+            with self.lock:
+                for player in self.sprite_groups["players"]:
+                    try:
+                        player.conn.sendall(length_message + message)
+                    except:
+                        print(f"Failed to send to {player.addr}")
+                        player.conn.close()  # remove_player() takes it out once the disconnect is seen
+
+        # Reset game state
+        self.game_running = False
+        self.waiting = True
+        self.winner = None
+        self.current_map = None
+
+        # Move all players back to waiting room
+        with self.lock:
+            for player in self.sprite_groups["players"]:
+                player.wins = 0
+                self.sprite_groups["waiting-players"].add(player)
+                player.reset_position(self.get_waiting_room_location())
+                player.reset_baseline(self.snapshot_seq + 1)
+            self.sprite_groups["players"].empty()
+
+    def start_game(self):
+        """Starts the game from the waiting room."""
+        self.game_running = True
+        self.waiting = False
+
+        for loc in self.used_waiting_room_locations:
+            self.waiting_room_locations.append(loc)
+        self.used_waiting_room_locations = []
+
+
+        # Call reset_round to start the game
+        self.reset_round()
+
+    def reset_round(self):
+        """Resets the game state for a new round."""
+
+        # Reset Tile Groups
+        self.sprite_groups["platform"].empty()
+
+        # Choose a new random map
+        self.current_map = random.choice(self.game_maps)
+        self.create_tile_map(self.current_map["map"])
+        map_id = self.game_maps.index(self.current_map)
+        spawn = list(self.current_map["spawn"])
+        self.map_hash = maps.map_hash(self.tile_data, spawn)
+        self.map_frame = pack_frame(
+            {
+                "type": "MAP",
+                "Map": map_id,
+                "MapHash": self.map_hash,
+                "TileMap": self.tile_data,
+                "Spawn": spawn,
+            }
+        )
+
+        # Move ready players from waiting room to game
+        with self.lock:
+            players_to_move = [player for player in self.sprite_groups["waiting-players"] if player in self.ready]
+
+        for player in players_to_move: 
+            with self.lock:
+                self.sprite_groups["players"].add(player)
+                self.sprite_groups["waiting-players"].remove(player)
+
+
+        # Reset player positions
+        with self.lock:
+            for player in self.sprite_groups["players"]:
+                player.reset_position(self.current_map["spawn"])
+                player.reset_baseline(self.snapshot_seq + 1)  # New map, start from a keyframe
+                player.input_ticks = 0  # Clients restart prediction from the spawn
+                player.buttons = 0
+                player.inputs.clear()
+                player.sent_input_ack = None
+
+        # Reset winner
+        self.winner = None
+
+        # Send new game state to all players
+        new_state = {
+            "type": "NEW GAME",
+            "Players": self.get_player_state(),
+            "Map": map_id,
+            "MapHash": self.map_hash,
+            "Spawn": spawn,
+            "PlayerWins": {player.color: player.wins for player in self.sprite_groups["players"]},
+        }
+        message = msgpack.packb(new_state)
+        length_message = len(message).to_bytes(4, byteorder="big")
+        with self.lock:
+            for player in self.sprite_groups["players"]:
+                try:
+                    player.conn.sendall(length_message + message)
+                except:
+                    print(f"Failed to send to {player.addr}")
+                    player.conn.close()  # remove_player() takes it out once the disconnect is seen
+
+        # Clear ready list
+        self.ready = []
+
+        # Start countdown, counted down by update()
+        self.countdown_value = 3
+        self.countdown_at = time.monotonic()
+
+    def round_over(self):
+        """Handles the end of a round."""
+        self.winner.wins += 1
+        if self.winner.wins < 3:
+            self.reset_round()
+        elif self.winner.wins >= 3:
+            self.game_over()
+
+    def simulate_tick(self):
+        """Advances the game by one fixed step, returns True if no players are left."""
+        with self.lock:
+            players = self.begin_tick()
+            if not players:
+                return True
+
+            for player in players:
+                reached_goal = player.update(
+                    self.tile_grid, self.current_map["spawn"]
+                )
+                if reached_goal:
+                    self.winner = player
+                    break
+
+            self.update_platforms()
+        return False
+
+    def begin_tick(self):
+        """Returns the players to simulate this tick with their input applied, call with self.lock held.
+
+        Every player takes its input before anyone moves, so a tick reads the
+        same inputs whether players are stepped one by one or in a batch.
+        """
+        players = list(self.sprite_groups["players"])
+        for player in players:
+            player.consume_input()
+        return players
+
+    def update_platforms(self):
+        """Recolors claimed platforms after the players moved, call with self.lock held.
+
+        Only platforms a player landed on are visited, in map order, and they
+        drop out once their occupant leaves, so unclaimed tiles cost nothing.
+        """
+        if not self.tile_grid.occupied:
+            return
+
+        occupants = {player.color: player for player in self.sprite_groups["players"]}
+        claimed = sorted(self.tile_grid.occupied, key=lambda tile: (tile.rect.y, tile.rect.x))
+        for tile in claimed:
+            changed = tile.update(occupants)
+            if tile.occupied_by is None:
+                self.tile_grid.release(tile)
+            if changed:
+                self.changed_tiles.append(
+                    {
+                        "x": tile.rect.x,
+                        "y": tile.rect.y,
+                        "color": tile.color,
+                    }
+                )
+
+    def update(self, ticks):
+        """Advances the room by the number of ticks the scheduler says are due."""
+        if not self.start_update(ticks):
+            return
+
+        # Catch up on every due tick, then send the result at most once
+        end_game = False
+        for _ in range(ticks):
+            end_game = self.simulate_tick()
+            if end_game or self.winner is not None:
+                break
+
+        self.finish_update(ticks, end_game)
+
+    def start_update(self, ticks):
+        """Runs the waiting room and countdown, returns True if the round needs simulating."""
+        self.tick += ticks
+        if self.waiting:
+            should_start_game = False
+            with self.lock:
+
+                if self.sprite_groups["waiting-players"] and len(self.sprite_groups["waiting-players"]) == len(self.ready):
+                    print(f"Room {self.code}: All players are ready!")
+                    should_start_game = True
+
+            if should_start_game:
+                self.start_game()
+
+            elif self.send_due(ticks) and self.sprite_groups["waiting-players"]:
+                self.broadcast()
+            return False
+
+        if self.countdown_value is not None:
+            self.countdown()
+            return False
+
+        return self.game_running
+
+    def finish_update(self, ticks, end_game):
+        """Broadcasts the simulated ticks and ends the round or game if it is over."""
+
+        # Broadcast state at SEND_RATE, and always the final state of a round
+        if self.send_due(ticks) or end_game or self.winner is not None:
+            self.broadcast()
+
+        if end_game:
+            self.game_over()
+
+        # Check to reset round if winner
+        if self.winner is not None:
+            self.round_over()
+
+    def shutdown(self):
+        """Tells the room's players the server is going away and closes their connections."""
+        message = msgpack.packb({"type": "SHUTTING DOWN"})
+        length_message = len(message).to_bytes(4, byteorder="big")
+
+        for player in (
+            self.sprite_groups["players"] or self.sprite_groups["waiting-players"]
+        ):
+            try:
+                player.conn.sendall(length_message + message)
+                player.conn.close()
+            except:
+                pass
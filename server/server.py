@@ -1,12 +1,13 @@
 import socket
 import msgpack
 import threading
-import pygame
-import random
+import sys
+import time
 from shared import constants
-from .tile import Tile
-from .player import Player
-from . import tilemaps
+from shared.framing import FrameReader
+from .room import Room, new_room_code
+from .timestep import FixedTimestep
+from .network import NetworkCore, ThreadedConnection
 
 # for encoding IP
 import base64
@@ -24,7 +25,9 @@ def encode_ip(ip):
 
 
 class GameServer:
-    def __init__(self):
+    """Lobby and scheduler: routes connections to rooms and steps every room from one clock."""
+
+    def __init__(self, event_loop=False, batch_physics=False):
         self.host = constants.HOST
         self.port = constants.PORT
         self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -33,178 +36,132 @@ class GameServer:
         )  # Enable SO_REUSEADDR
         self.server.settimeout(1.0)
 
-        self.sprite_groups = {
-            "ground": pygame.sprite.Group(),  # Used for Collision
-            "platform": pygame.sprite.Group(),  # Used for Collision
-            "goal": pygame.sprite.Group(),  # Used for Collision
-            "players": pygame.sprite.Group(),  # Used for Collision and Broadcasting
-            "waiting-players": pygame.sprite.Group(),  # Used for Waiting Room
-        }
-
-        self.lock = threading.Lock()
-        self.clock = pygame.time.Clock()
-
-        # Player Colors
-        self.unused_colors = [
-            "red",
-            "blue",
-            "green",
-            "yellow",
-            "purple",
-            "orange",
-            "pink",
-            "cyan",
-        ]  # 8 Players, should be fine
-        self.used_colors = []
-
-        # Player Waiting Room Locations
-        self.waiting_room_locations = [ (128, 160), (256, 160), (384, 160), (512, 160),
-                                        (128, 280), (256, 280), (384, 280), (512, 280),
-                                      ]  # List of (x, y) coordinates for players to be placed in the waiting room
-        self.used_waiting_room_locations = []
-
-        # Tilemap
-        self.tile_size = constants.TILE_SIZE
-        self.changed_tiles = []  # used for sending tile changes to clients
-        self.tile_data = []  # used for sending of tile map to clients
-
-        self.game_maps = [tilemaps.game_1, tilemaps.game_2]
-        self.current_map = None
-
-        # Game Logic
-        self.winner = None
+        # Rooms
+        self.rooms = {}  # room code -> Room
+        self.players = {}  # connection -> Player, once the client has joined a room
+        self.lock = threading.Lock()  # Guards rooms and players, each room has its own lock
+
+        # Networking, a single-threaded selector loop replaces the per-client threads if enabled
+        self.event_loop = event_loop
+        self.network = None
+        self.control = None  # Unix socket to the supervisor when running as a room worker
+        self.last_lag_report = 0
+        self.reported_drops = {}  # addr -> dropped STATE count at the last lag report
+
+        # Fixed timestep simulation, shared by every room
+        self.timestep = FixedTimestep()
+        self.physics = None  # BatchPhysics stepping every room's players at once, if enabled
+        if batch_physics:
+            from . import physics  # Only batch physics servers pay for importing NumPy
+
+            if physics.available():
+                self.physics = physics.BatchPhysics()
+            else:
+                print("NumPy is not installed, stepping players one by one")
+        self.last_tick_report = time.monotonic()
+
         self.running = False  # Game Loop
-        self.waiting = False  # Waiting Room
-        self.game_running = False  # Game Running
-        self.ready = []  # Ready Players
-
-    def create_tile_map(self, map, waiting=False):
-        """Creates the tile map based on the given 2D array."""
-        self.tile_data = []
-        for row in range(len(map)):
-            for col in range(len(map[row])):
-                x = col * self.tile_size
-                y = row * self.tile_size
-
-                # Ground
-                if map[row][col] == 1:
-                    Tile(
-                        x,
-                        y,
-                        self.tile_size,
-                        self.tile_size,
-                        1,
-                        self.sprite_groups["ground"],
-                    )
-                    self.tile_data.append({"x": x, "y": y, "type": 1})
-
-                # Platform
-                elif map[row][col] == 2:
-                    Tile(
-                        x,
-                        y,
-                        self.tile_size,
-                        self.tile_size,
-                        2,
-                        self.sprite_groups["platform"],
-                    )
-                    self.tile_data.append({"x": x, "y": y, "type": 2})
-
-                # Goal
-                elif map[row][col] == 3:
-                    Tile(
-                        x,
-                        y,
-                        self.tile_size,
-                        self.tile_size,
-                        3,
-                        self.sprite_groups["goal"],
-                    )
-                    self.tile_data.append({"x": x, "y": y, "type": 3})
-
-    def receive_message(self, sock):
-        # First, receive the 4-byte header that contains the length
-        length_data = b""
-        while len(length_data) < 4:
-            chunk = sock.recv(4 - len(length_data))
-            if not chunk:
-                raise Exception("Error: Connection lost while receiving length header.")
-            length_data += chunk
-
-        # Convert the 4-byte length data to an integer
-        message_length = int.from_bytes(length_data, byteorder="big")
-
-        # Now, receive the actual message of the specified length
-        message_data = b""
-        while len(message_data) < message_length:
-            chunk = sock.recv(message_length - len(message_data))
-            if not chunk:
-                raise Exception("Error: Connection lost while receiving message.")
-            message_data += chunk
-
-        return message_data
 
     def send_message(self, conn, message):
         message_pack = msgpack.packb(message)
         length_message = len(message_pack).to_bytes(4, byteorder="big")
         conn.sendall(length_message + message_pack)
 
-    def handle_client(self, conn, addr):
-        print(f"New connection: {addr}")
-        color = self.get_color()
-        if color == "Error: No more colors available":
-            self.send_message(conn, "Error: No more colors available")
-            conn.close()
-            return
-
-        location = self.get_waiting_room_location()
-        player = Player(color, location, self.tile_size, self.tile_size)
-        player.conn = conn  # Store connection for broadcasting
-        player.addr = addr  # Store address
+    def accept_client(self, conn):
+        """Accepts a connection into the lobby, it joins a room with its first message."""
+        print(f"New connection: {conn.addr}")
+        return conn
+
+    def find_room(self, code):
+        """Returns the room for code, creating it if needed, or an error message."""
+        if code:
+            code = code.upper()
+            if not code.isalnum() or len(code) > constants.ROOM_CODE_LENGTH:
+                return "Error: Invalid room code"
+            room = self.rooms.get(code)
+        else:
+            # No code, any room with a free slot will do
+            room = next((r for r in self.rooms.values() if not r.is_full()), None)
+            code = new_room_code(self.rooms)
+
+        if room is None:
+            if len(self.rooms) >= constants.MAX_ROOMS:
+                return "Error: No more rooms available"
+            room = Room(code)
+            self.rooms[code] = room
+            print(f"Room {code} opened, {len(self.rooms)} rooms")
+
+        if room.is_full():
+            return "Error: No more colors available"
+        return room
 
+    def join(self, conn, code):
+        """Adds the connection to a room as a waiting player, returns None if it can't join."""
         with self.lock:
-            self.sprite_groups["waiting-players"].add(player)
-
-        # Send waiting room game state
-        initial_state = {
-            "type": "INITIAL",
-            "Players": self.get_player_state(waiting=True),
-            "YourPlayer": player.color,
-        }
-        self.send_message(conn, initial_state)
+            room = self.find_room(code)
+            if isinstance(room, str):
+                self.send_message(conn, room)
+                self.report_room(code)  # Let the supervisor correct its count
+                return None
+            player = room.add_player(conn, conn.addr)
+            self.players[conn] = player
+
+        print(f"Client {conn.addr} joined room {room.code} as {player.color}")
+        self.report_room(room.code)
+        return player
+
+    def report_room(self, code):
+        """Tells the supervisor how many players a room has, 0 once it closed."""
+        if self.control is None or code is None:
+            return
+        room = self.rooms.get(code)
+        players = len(room.used_colors) if room is not None else 0
+        message = {"type": "ROOM", "room": code, "players": players}
+        try:
+            self.control.send(msgpack.packb(message))
+        except OSError as e:
+            print(f"Failed to report room {code} to the supervisor: {e}")
+
+    def handle_message(self, conn, player_data):
+        """Routes one decoded client message, returns False when the client disconnects."""
+        player = self.players.get(conn)
+        if player is not None:
+            return player.room.handle_message(player, player_data)
+
+        # Lobby, the first message picks the room
+        if player_data["type"] != "JOIN":
+            print(f"Client {conn.addr} sent {player_data['type']} before joining a room")
+            return False
+        return self.join(conn, player_data.get("room")) is not None
+
+    def remove_client(self, conn):
+        """Removes a disconnected client from its room, closing the room once it is empty."""
+        conn.close()
+        with self.lock:
+            player = self.players.pop(conn, None)
+            if player is not None:
+                room = player.room
+                room.remove_player(player)
+                if room.is_empty():
+                    del self.rooms[room.code]
+                    print(f"Room {room.code} closed, {len(self.rooms)} rooms")
+        if player is not None:
+            self.report_room(room.code)
+        self.reported_drops.pop(conn.addr, None)
+        print(f"Client {conn.addr} disconnected.")
+
+    def handle_client(self, sock, addr):
+        conn = ThreadedConnection(sock, addr)  # Writer thread owns all sends to this client
+        frames = FrameReader(sock).pump()
+        self.accept_client(conn)
 
         try:
             while self.running:
                 try:
-                    data = self.receive_message(conn)
-                    player_data = msgpack.unpackb(data)
-
-                    # Handle disconnect input
-                    if player_data["type"] == "DISCONNECT":
-                        self.send_message(conn, "DISCONNECTED")
+                    player_data = msgpack.unpackb(next(frames))
+                    if not self.handle_message(conn, player_data):
                         break
 
-                    # Handle ready input
-                    elif player_data["type"] == "READY":
-                        if player not in self.ready:  # Avoid duplicate entries
-                            self.ready.append(player)
-
-                    # Handle movement input
-                    elif player_data["type"] == "MOVE":
-                        # player = self.clients[addr]
-                        if player_data["direction"] in ["left", "right"]:
-                            player.direction = player_data["direction"]
-                        else:
-                            print(f"Invalid direction: {player_data['direction']}")
-
-                    # Handle jump input
-                    elif player_data["type"] == "JUMP":
-                        # player = self.clients[addr]
-                        player.jump = True
-                        player.drag_vector = pygame.math.Vector2(
-                            player_data["drag_x"], player_data["drag_y"]
-                        )
-
                 except Exception as e:
                     print(f"Error processing message from {addr}: {e}")
                     break
@@ -214,115 +171,49 @@ class GameServer:
         except Exception as e:
             print(f"Error with client {addr}: {e}")
         finally:
-            conn.close()
-            self.unused_colors.append(player.color)
-            self.used_colors.remove(player.color)
-            with self.lock:
-                if player in self.sprite_groups["players"]:
-                    self.sprite_groups["players"].remove(player)
-                elif player in self.sprite_groups["waiting-players"]:
-                    self.sprite_groups["waiting-players"].remove(player)
-                    self.waiting_room_locations.append(player.rect.bottomleft)
-                    self.used_waiting_room_locations.remove(player.rect.bottomleft)
-            print(f"Client {addr} disconnected.")
-
-    def get_player_state(self, waiting=False):
-        players = []
-        if waiting:
-            players = [
-                {
-                    "x": p.position.x,
-                    "y": p.position.y,
-                    "color": p.color,
-                    "in_air": p.in_air,
-                }
-                for p in self.sprite_groups["waiting-players"]
-            ]
-        else:
-            players = [
-                {
-                    "x": p.position.x,
-                    "y": p.position.y,
-                    "color": p.color,
-                    "in_air": p.in_air,
-                }
-                for p in self.sprite_groups["players"]
-            ]
-        return players
-
-    def get_color(self):
-        if len(self.unused_colors) == 0:
-            return "Error: No more colors available"
-        color = self.unused_colors.pop(0)
-        self.used_colors.append(color)
-        return color
-
-    def get_waiting_room_location(self):
-        location = self.waiting_room_locations.pop(0)
-        self.used_waiting_room_locations.append(location)
-        return location
-
-    def broadcast(self):
-        """Broadcasts game state to all connected clients"""
-        waiting_state = {
-            "type": "STATE",
-            "players": self.get_player_state(waiting=True),
-            "tiles": None,
-        }
-
-        waiting_message = msgpack.packb(waiting_state)
-        waiting_length_message = len(waiting_message).to_bytes(4, byteorder="big")
-
-        game_state = {
-            "type": "STATE",
-            "players": self.get_player_state(),
-            "tiles": self.changed_tiles,
-        }
-
-        game_message = msgpack.packb(game_state)
-        game_length_message = len(game_message).to_bytes(4, byteorder="big")
+            self.remove_client(conn)
 
+    def connection_stats(self):
+        """Returns outbound queue depth and drop counters for every connected player."""
         with self.lock:
-            for player in self.sprite_groups["players"]:
-                try:
-                    player.conn.sendall(game_length_message + game_message)
-                except:
-                    print(f"Failed to send to {player.addr}")
-                    player.conn.close()
-                    self.sprite_groups["players"].remove(player)
+            rooms = list(self.rooms.values())
+        return [stats for room in rooms for stats in room.connection_stats()]
 
-            for player in self.sprite_groups["waiting-players"]:
-                try:
-                    player.conn.sendall(waiting_length_message + waiting_message)
-                except:
-                    print(f"Failed to send to {player.addr}")
-                    player.conn.close()
-                    self.sprite_groups["waiting-players"].remove
+    def report_lagging_clients(self):
+        """Prints clients that had STATE frames dropped since the last report."""
+        now = time.monotonic()
+        if now - self.last_lag_report < constants.LAG_REPORT_INTERVAL:
+            return
+        self.last_lag_report = now
+
+        for stats in self.connection_stats():
+            dropped = stats["dropped"] - self.reported_drops.get(stats["addr"], 0)
+            self.reported_drops[stats["addr"]] = stats["dropped"]
+            if dropped > 0:
+                print(
+                    f"Client {stats['addr']} ({stats['color']}, room {stats['room']}) is lagging: "
+                    f"{dropped} STATE frames dropped, queue depth {stats['depth']}, "
+                    f"max depth {stats['max_depth']}, send rate {stats['send_rate']:.0f}/s"
+                )
 
     def stop(self):
         """Cleanly stop the server"""
         self.running = False
-        # Create a temporary socket to unblock accept()
-        try:
-            tmp_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            tmp_socket.connect((self.host, self.port))
-            tmp_socket.close()
-        except:
-            pass
-
-        # Clean up
-        message = msgpack.packb({"type": "SHUTTING DOWN"})
-        length_message = len(message).to_bytes(4, byteorder="big")
-
-        for player in (
-            self.sprite_groups["players"] or self.sprite_groups["waiting-players"]
-        ):
+        # Create a temporary socket to unblock accept(), workers don't own the port
+        if self.control is None:
             try:
-                player.conn.sendall(length_message + message)
-                player.conn.close()
+                tmp_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                tmp_socket.connect((self.host, self.port))
+                tmp_socket.close()
             except:
                 pass
 
+        # Clean up
+        with self.lock:
+            rooms = list(self.rooms.values())
+        for room in rooms:
+            room.shutdown()
+
     def start(self):
         self.server.bind((self.host, self.port))
         self.server.listen()
@@ -330,8 +221,23 @@ class GameServer:
         print(f"IP address of server is: {get_ipv4()}")
         print(f"the code is: {encode_ip(get_ipv4())}")
 
-        # Begin Waiting Room
-        self.waiting = True
+        if self.event_loop:
+            self.network = NetworkCore(
+                self.server,
+                on_connect=self.accept_client,
+                on_message=self.handle_message,
+                on_disconnect=self.remove_client,
+            )
+            try:
+                self.game_loop()  # Polls the sockets between frames
+            except KeyboardInterrupt:
+                print("\nShutting down server...")
+            finally:
+                self.stop()
+                self.network.close()
+                self.server.close()
+                print("Server shut down complete")
+            return
 
         # Start game loop thread
         game_thread = threading.Thread(target=self.game_loop)
@@ -357,201 +263,121 @@ class GameServer:
             self.server.close()
             print("Server shut down complete")
 
-    def countdown(self):
-        """Performs a countdown before starting the game."""
-
-        for countdown_val in range(3, -1, -1):
-            message = msgpack.packb({"type": "COUNTDOWN", "value": countdown_val})
-            length_message = len(message).to_bytes(4, byteorder="big")
-            with self.lock:
-                for player in self.sprite_groups["players"]:
-                    try:
-                        player.conn.sendall(length_message + message)
-                    except:
-                        print(f"Failed to send to {player.addr}")
-                        player.conn.close()
-                        self.sprite_groups["players"].remove(player)
-
-                if countdown_val != 0:
-                    pygame.time.wait(1000)
-
-                    # Small delay to prevent CPU hogging
-                    pygame.time.wait(10)
-
-    def game_over(self):
-        """Handles the end of the game."""
-
-        # Send game over message
-        if self.winner is not None:
-            message = msgpack.packb({"type": "GAME OVER", "winner": self.winner.color})
-            length_message = len(message).to_bytes(4, byteorder="big")
-            with self.lock:
-                for player in self.sprite_groups["players"]:
-                    try:
-                        player.conn.sendall(length_message + message)
-                    except:
-                        print(f"Failed to send to {player.addr}")
-                        player.conn.close()
-                        self.sprite_groups["players"].remove(player)
-
-        # Reset game state
-        self.game_running = False
-        self.waiting = True
-        self.winner = None
-        self.current_map = None
-
-        # Move all players back to waiting room
-        with self.lock:
-            for player in self.sprite_groups["players"]:
-                player.wins = 0
-                self.sprite_groups["waiting-players"].add(player)
-                player.reset_position(self.get_waiting_room_location())
-            self.sprite_groups["players"].empty()
-
-
-    def start_game(self):
-        """Starts the game from the waiting room."""
-        self.game_running = True
-        self.waiting = False
-
-        for loc in self.used_waiting_room_locations:
-            self.waiting_room_locations.append(loc)
-        self.used_waiting_room_locations = []
-
-
-        # Call reset_round to start the game
-        self.reset_round()
+    def serve_worker(self, control):
+        """Runs as a room worker, clients arrive as sockets passed over control by the supervisor."""
+        self.control = control
+        self.network = NetworkCore(
+            None,
+            on_connect=self.accept_client,
+            on_message=self.handle_message,
+            on_disconnect=self.remove_client,
+        )
+        self.network.watch(control, self.receive_handoff)
+        try:
+            self.game_loop()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+            self.network.close()
+            self.server.close()
+            control.close()
 
-    def reset_round(self):
-        """Resets the game state for a new round."""
+    def receive_handoff(self):
+        """Adopts a client socket passed by the supervisor and joins the room its JOIN asked for."""
+        try:
+            data, fds, _, _ = socket.recv_fds(self.control, constants.HANDOFF_SIZE, 1)
+        except OSError:
+            data = b""
+        if not data:
+            self.running = False  # Supervisor is gone
+            return
 
-        # Reset Tile Groups
-        self.sprite_groups["ground"].empty()
-        self.sprite_groups["platform"].empty()
-        self.sprite_groups["goal"].empty()
+        handoff = msgpack.unpackb(data)
+        if handoff["type"] == "STOP":
+            self.running = False
+            return
 
-        # Choose a new random map
-        self.current_map = random.choice(self.game_maps)
-        self.create_tile_map(self.current_map["map"])
+        conn = None
+        try:
+            conn = self.network.add(socket.socket(fileno=fds[0]), tuple(handoff["addr"]))
+            if conn is None:
+                return
+            if self.join(conn, handoff["room"]) is None:
+                conn.close()
+                return
+
+            # Anything the client sent after its JOIN was read by the supervisor
+            conn.reader.feed(handoff["buffered"])
+            for message in conn.decode_buffered():
+                if self.handle_message(conn, message) is False:
+                    conn.close()
+                    break
+        except Exception as e:
+            print(f"Error adopting client {handoff['addr']}: {e}")
+            if conn is not None:
+                conn.close()
 
-        # Move ready players from waiting room to game
-        with self.lock:
-            players_to_move = [player for player in self.sprite_groups["waiting-players"] if player in self.ready]
+    def wait_for_next_tick(self):
+        """Sleeps until the next tick is due, polling the sockets meanwhile in event loop mode."""
+        remaining = self.timestep.time_until_next()
 
-        for player in players_to_move: 
-            with self.lock:
-                self.sprite_groups["players"].add(player)
-                self.sprite_groups["waiting-players"].remove(player)
+        if self.network is None:
+            time.sleep(max(remaining, 0))
+            return
 
+        while True:
+            self.network.poll(max(remaining, 0))
+            remaining = self.timestep.time_until_next()
+            if remaining <= 0:
+                break
 
-        # Reset player positions
-        with self.lock:
-            for player in self.sprite_groups["players"]:
-                player.reset_position(self.current_map["spawn"])
-
-        # Reset winner
-        self.winner = None
-
-        # Send new game state to all players
-        new_state = {
-            "type": "NEW GAME",
-            "Players": self.get_player_state(),
-            "TileMap": self.tile_data,
-            "PlayerWins": {player.color: player.wins for player in self.sprite_groups["players"]},
-        }
-        message = msgpack.packb(new_state)
-        length_message = len(message).to_bytes(4, byteorder="big")
-        with self.lock:
-            for player in self.sprite_groups["players"]:
-                try:
-                    player.conn.sendall(length_message + message)
-                except:
-                    print(f"Failed to send to {player.addr}")
-                    player.conn.close()
-                    self.sprite_groups["players"].remove(player)
-
-        # Clear ready list
-        self.ready = []
-
-        # Start countdown
-        self.countdown()
-
-    def round_over(self):
-        """Handles the end of a round."""
-        self.winner.wins += 1
-        if self.winner.wins < 3:
-            self.reset_round()
-        elif self.winner.wins >= 3:
-            self.game_over()
+    def report_tick_timing(self):
+        """Prints tick overruns, lateness and catch-up since the last report, if there were any."""
+        now = time.monotonic()
+        if now - self.last_tick_report < constants.TICK_REPORT_INTERVAL:
+            return
+        self.last_tick_report = now
+
+        stats = self.timestep.stats()
+        self.timestep.reset_stats()
+        if stats["overruns"] or stats["catch_up"] or stats["skipped"]:
+            print(
+                f"Server falling behind: {stats['overruns']} overruns in {stats['ticks']} ticks, "
+                f"work {stats['mean_work_ms']:.1f} ms mean / {stats['max_work_ms']:.1f} ms max, "
+                f"late {stats['mean_lateness_ms']:.1f} ms mean / {stats['max_lateness_ms']:.1f} ms max, "
+                f"{stats['catch_up']} catch-up ticks, {stats['skipped']} skipped"
+            )
 
     def game_loop(self):
-        """Main game loop running at 45 FPS"""
+        """Main loop, stepping every room at a fixed TICK_RATE from one scheduler"""
         self.running = True
         while self.running:
-            while self.waiting:
-                should_start_game = False
-                with self.lock:
+            ticks = self.timestep.advance()
+            if ticks:
+                work_start = time.monotonic()
 
-                    if self.sprite_groups["waiting-players"] and len(self.sprite_groups["waiting-players"]) == len(self.ready):
-                        print("All players are ready!")
-                        should_start_game = True
-
-                if should_start_game:
-                    self.start_game()
-
-                if self.sprite_groups["waiting-players"]:
-                    self.broadcast()
-
-                # Maintain 45 FPS
-                self.clock.tick(constants.FPS)
-
-            while self.game_running:
-
-                end_game = False
                 with self.lock:
-                    if not self.sprite_groups["players"]:
-                        end_game = True
-
-                    for player in self.sprite_groups["players"]:
-                        reached_goal = player.update(
-                            self.sprite_groups, self.current_map["spawn"]
-                        )
-                        if reached_goal:
-                            self.winner = player
-                            break
-
-                    for tile in self.sprite_groups["platform"]:
-                        changed = tile.update(self.sprite_groups["players"])
-                        if changed:
-                            self.changed_tiles.append(
-                                {
-                                    "x": tile.rect.x,
-                                    "y": tile.rect.y,
-                                    "color": tile.color,
-                                }
-                            )
-
-                # Broadcast state
-                self.broadcast()
-
-                # Clear changed tiles
-                self.changed_tiles = []
-
-                if end_game:
-                    self.game_over()
-
-                # Check to reset round if winner
-                if self.winner is not None:
-                    self.round_over()
-
-                # Maintain 45 FPS
-                self.clock.tick(constants.FPS)
+                    rooms = list(self.rooms.values())
+                if self.physics is not None:
+                    self.physics.update(rooms, ticks)
+                else:
+                    for room in rooms:
+                        room.update(ticks)
 
-        server.stop()
+                self.timestep.record_work(time.monotonic() - work_start)
+                self.report_tick_timing()
+                self.report_lagging_clients()
+
+            self.wait_for_next_tick()
 
+        self.stop()
 
 if __name__ == "__main__":
-    server = GameServer()
+    server = GameServer(
+        event_loop="--event-loop" in sys.argv,
+        batch_physics="--batch-physics" in sys.argv,
+    )
     try:
         server.start()
     except KeyboardInterrupt:
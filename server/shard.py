@@ -0,0 +1,242 @@
+# Dedicated server topology: one supervisor process owns PORT, reads each client's JOIN
+# and passes the socket to the room worker process that owns the room, one worker per core.
+#
+#   python -m server.shard [workers] [--batch-physics]
+import multiprocessing
+import os
+import selectors
+import signal
+import socket
+import sys
+import time
+import msgpack
+from shared import constants
+from .room import new_room_code
+from .server import GameServer, get_ipv4, encode_ip
+
+
+def run_worker(control, index, batch_physics=False):
+    """Entry point of a room worker process."""
+    print(f"Worker {index} started (pid {os.getpid()})")
+    GameServer(event_loop=True, batch_physics=batch_physics).serve_worker(control)
+
+
+class Supervisor:
+    """Accepts clients on PORT and hands each one to the worker process that owns its room.
+
+    Workers report their rooms' player counts back, so joins without a room
+    code can be sent to an open room and new rooms to the least loaded worker.
+    """
+
+    def __init__(self, worker_count=None, batch_physics=False):
+        self.host = constants.HOST
+        self.port = constants.PORT
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.setblocking(False)
+
+        self.selector = selectors.DefaultSelector()
+        self.worker_count = worker_count or os.cpu_count() or 1
+        self.batch_physics = batch_physics  # Workers step all their rooms' players in one NumPy pass
+        self.workers = [None] * self.worker_count  # index -> (process, control socket)
+        self.rooms = {}  # room code -> [worker index, player count]
+        self.pending = {}  # client socket -> [addr, buffer, deadline] until its JOIN arrives
+        self.running = False
+
+    def start_worker(self, index):
+        # SOCK_SEQPACKET keeps each handoff and its file descriptor in one message
+        control, child = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+
+        # Spawn rather than fork, so workers don't inherit pending client sockets
+        context = multiprocessing.get_context("spawn")
+        process = context.Process(target=run_worker, args=(child, index, self.batch_physics))
+        process.daemon = True
+        process.start()
+        child.close()
+
+        self.workers[index] = (process, control)
+        self.selector.register(control, selectors.EVENT_READ, ("worker", index))
+
+    def start(self):
+        self.server.bind((self.host, self.port))
+        self.server.listen()
+        self.selector.register(self.server, selectors.EVENT_READ, ("accept", None))
+        print(f"Server listening on {self.host}:{self.port} with {self.worker_count} workers")
+        print(f"IP address of server is: {get_ipv4()}")
+        print(f"the code is: {encode_ip(get_ipv4())}")
+
+        for index in range(self.worker_count):
+            self.start_worker(index)
+
+        # Shut down cleanly when the host stops the service, not only on Ctrl+C
+        self.running = True
+        signal.signal(signal.SIGTERM, lambda signum, frame: setattr(self, "running", False))
+        try:
+            while self.running:
+                for key, mask in self.selector.select(1.0):
+                    kind, data = key.data
+                    if kind == "accept":
+                        self.accept()
+                    elif kind == "client":
+                        self.read_join(key.fileobj)
+                    elif kind == "worker":
+                        self.read_worker(data)
+                self.expire_pending()
+                self.check_workers()
+        except KeyboardInterrupt:
+            print("\nShutting down server...")
+        finally:
+            self.stop()
+            print("Server shut down complete")
+
+    def accept(self):
+        try:
+            sock, addr = self.server.accept()
+        except (BlockingIOError, InterruptedError):
+            return
+        print(f"New connection: {addr}")
+        sock.setblocking(False)
+        self.pending[sock] = [addr, bytearray(), time.monotonic() + constants.JOIN_TIMEOUT]
+        self.selector.register(sock, selectors.EVENT_READ, ("client", None))
+
+    def drop_pending(self, sock):
+        self.selector.unregister(sock)
+        del self.pending[sock]
+        sock.close()
+
+    def read_join(self, sock):
+        addr, buffer, deadline = self.pending[sock]
+        try:
+            chunk = sock.recv(constants.MAX_JOIN_SIZE)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as e:
+            print(f"Error with client {addr}: {e}")
+            chunk = b""
+        if not chunk:
+            self.drop_pending(sock)
+            return
+        buffer += chunk
+
+        if len(buffer) < 4:
+            return
+        message_length = int.from_bytes(buffer[:4], byteorder="big")
+        if message_length > constants.MAX_JOIN_SIZE:
+            print(f"Client {addr} sent an oversized JOIN")
+            self.drop_pending(sock)
+            return
+        if len(buffer) < 4 + message_length:
+            return
+
+        try:
+            join = msgpack.unpackb(buffer[4 : 4 + message_length])
+            code = join["room"] if join["type"] == "JOIN" else None
+        except Exception as e:
+            print(f"Client {addr} sent an invalid JOIN: {e}")
+            self.drop_pending(sock)
+            return
+
+        self.selector.unregister(sock)
+        del self.pending[sock]
+        self.route(sock, addr, code, bytes(buffer[4 + message_length :]))
+
+    def expire_pending(self):
+        now = time.monotonic()
+        for sock, (addr, buffer, deadline) in list(self.pending.items()):
+            if now > deadline:
+                print(f"Client {addr} did not join a room in time")
+                self.drop_pending(sock)
+
+    def pick_room(self, code):
+        """Returns (code, worker index) a JOIN for code should be sent to."""
+        if code:
+            code = str(code).upper()
+        else:
+            # No code, any room with a free slot will do
+            code = next(
+                (
+                    c
+                    for c, (index, players) in self.rooms.items()
+                    if players < len(constants.PLAYER_COLORS)
+                ),
+                None,
+            ) or new_room_code(self.rooms)
+
+        if code not in self.rooms:
+            # New rooms go to the worker with the fewest players
+            load = [0] * self.worker_count
+            for index, players in self.rooms.values():
+                load[index] += players
+            self.rooms[code] = [load.index(min(load)), 0]
+        return code, self.rooms[code][0]
+
+    def route(self, sock, addr, code, buffered):
+        code, index = self.pick_room(code)
+        process, control = self.workers[index]
+        handoff = {"type": "JOIN", "room": code, "addr": list(addr), "buffered": buffered}
+        try:
+            socket.send_fds(control, [msgpack.packb(handoff)], [sock.fileno()])
+            self.rooms[code][1] += 1  # Until the worker reports the real count
+        except OSError as e:
+            print(f"Failed to hand {addr} to worker {index}: {e}")
+            if self.rooms[code][1] == 0:
+                del self.rooms[code]
+        finally:
+            sock.close()  # The worker has its own copy of the descriptor
+
+    def read_worker(self, index):
+        process, control = self.workers[index]
+        try:
+            data = control.recv(constants.HANDOFF_SIZE)
+        except OSError:
+            data = b""
+        if not data:
+            return  # Worker exited, check_workers restarts it
+
+        report = msgpack.unpackb(data)
+        if report["type"] == "ROOM":
+            if report["players"] == 0:
+                self.rooms.pop(report["room"], None)
+            else:
+                self.rooms[report["room"]] = [index, report["players"]]
+
+    def check_workers(self):
+        """Restarts workers that died, their rooms and players are lost."""
+        for index, (process, control) in enumerate(self.workers):
+            if process.is_alive():
+                continue
+            print(f"Worker {index} exited with code {process.exitcode}, restarting")
+            self.selector.unregister(control)
+            control.close()
+            for code in [c for c, (i, _) in self.rooms.items() if i == index]:
+                del self.rooms[code]
+            self.start_worker(index)
+
+    def stop(self):
+        self.running = False
+        for sock in list(self.pending):
+            self.drop_pending(sock)
+
+        for process, control in self.workers:
+            if process is None:
+                continue
+            try:
+                control.send(msgpack.packb({"type": "STOP"}))
+            except OSError:
+                pass
+        for process, control in self.workers:
+            if process is None:
+                continue
+            process.join(timeout=2)
+            if process.is_alive():
+                process.terminate()
+            control.close()
+
+        self.selector.close()
+        self.server.close()
+
+
+if __name__ == "__main__":
+    counts = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    worker_count = int(counts[0]) if counts else None
+    Supervisor(worker_count, batch_physics="--batch-physics" in sys.argv).start()
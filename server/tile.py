@@ -1,23 +1,15 @@
-import pygame
-import os
 from shared import constants
+from .geometry import Rect
 
 
-class Tile(pygame.sprite.Sprite):
-    def __init__(self, x, y, width, height, image_integer, sub_group=""):
-        super().__init__()
+class Tile:
+    __slots__ = ("color", "rect", "occupied_by")
 
+    def __init__(self, x, y, width, height, image_integer, sub_group=""):
         self.color = None
-        self.image = pygame.Surface([width, height])
 
         if image_integer == 1:
             ground_color = (170, 120, 80)
-            border_color = (150, 100, 60)
-
-            self.image.fill(border_color)
-            pygame.draw.rect(
-                self.image, ground_color, [0, height // 2, width, height // 2]
-            )
 
             sub_group.add(self)
             self.color = ground_color
@@ -26,16 +18,6 @@ class Tile(pygame.sprite.Sprite):
             platform_color = (
                 constants.DEFAULT_PLATFORM_COLOR
             )  # Use default platform color for now; will have to adjust for coloured occupation later
-            border_color = (
-                platform_color[0] - 30,
-                platform_color[1] - 30,
-                platform_color[2] - 30,
-            )
-
-            self.image.fill(border_color)
-            pygame.draw.rect(
-                self.image, platform_color, [0, height // 2, width, height // 2]
-            )
 
             sub_group.add(self)
             self.color = platform_color
@@ -43,23 +25,17 @@ class Tile(pygame.sprite.Sprite):
         if image_integer == 3:
             goal_color = (0, 0, 0)
 
-            self.image.fill(goal_color)
-            pygame.draw.rect(
-                self.image, goal_color, [0, height // 2, width, height // 2]
-            )
-
             sub_group.add(self)
             self.color = goal_color
 
-        # Get rects and positions
-        self.rect = self.image.get_rect()
-        self.rect.topleft = (x, y)
+        # Get rects and positions, the server never draws so there is no image
+        self.rect = Rect(x, y, width, height)
 
         # In Use
         self.occupied_by = None
 
-    def update(self, players):  # For platform tiles
-
+    def update(self, occupants):  # For platform tiles, occupants maps color -> player
+        """Recolors an occupied platform, returns True if its color changed."""
         if self.occupied_by is not None:
             # Check if the occupying player is still colliding with the tile
 
@@ -68,11 +44,8 @@ class Tile(pygame.sprite.Sprite):
             larger_rect.center = self.rect.center
 
             # Check if the player is still colliding with the tile
-            if any(
-                player.color == self.occupied_by
-                and larger_rect.colliderect(player.rect)
-                for player in players
-            ):
+            player = occupants.get(self.occupied_by)
+            if player is not None and larger_rect.colliderect(player.rect):
                 if self.color != self.occupied_by:
                     self.color = self.occupied_by
                     return True
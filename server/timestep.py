@@ -0,0 +1,76 @@
+import time
+from shared import constants
+
+
+class FixedTimestep:
+    """Schedules simulation ticks at a fixed rate, independent of how long a frame takes.
+
+    Tick n is due at start + n * step. When the loop falls behind, the missed
+    ticks are run back to back to catch up, but never more than max_ticks at
+    once; the rest of the backlog is skipped so the game does not fast-forward.
+    """
+
+    def __init__(self, rate=constants.TICK_RATE, max_ticks=constants.MAX_CATCH_UP_TICKS):
+        self.step = 1 / rate
+        self.max_ticks = max_ticks
+        self.start = time.monotonic()
+        self.tick = 0  # Index of the next tick to run
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.ticks = 0  # Ticks simulated
+        self.frames = 0  # Loop iterations that simulated at least one tick
+        self.catch_up = 0  # Extra ticks run in the same frame to catch up
+        self.skipped = 0  # Ticks dropped past the catch-up cap
+        self.overruns = 0  # Frames whose work took longer than one tick
+        self.max_work = 0
+        self.total_work = 0
+        self.max_lateness = 0
+        self.total_lateness = 0
+
+    def next_tick_time(self):
+        return self.start + self.tick * self.step
+
+    def time_until_next(self):
+        return self.next_tick_time() - time.monotonic()
+
+    def advance(self):
+        """Returns how many ticks are due now, skipping any backlog past the cap."""
+        now = time.monotonic()
+        lateness = now - self.next_tick_time()
+        if lateness < 0:
+            return 0
+
+        due = int(lateness / self.step) + 1
+        if due > self.max_ticks:
+            self.skipped += due - self.max_ticks
+            self.tick += due - self.max_ticks
+            due = self.max_ticks
+        self.tick += due
+
+        self.ticks += due
+        self.frames += 1
+        self.catch_up += due - 1
+        self.max_lateness = max(self.max_lateness, lateness)
+        self.total_lateness += lateness
+        return due
+
+    def record_work(self, seconds):
+        """Records how long the simulation and broadcast of one frame took."""
+        self.max_work = max(self.max_work, seconds)
+        self.total_work += seconds
+        if seconds > self.step:
+            self.overruns += 1
+
+    def stats(self):
+        frames = max(self.frames, 1)
+        return {
+            "ticks": self.ticks,
+            "catch_up": self.catch_up,
+            "skipped": self.skipped,
+            "overruns": self.overruns,
+            "max_work_ms": self.max_work * 1000,
+            "mean_work_ms": self.total_work / frames * 1000,
+            "max_lateness_ms": self.max_lateness * 1000,
+            "mean_lateness_ms": self.total_lateness / frames * 1000,
+        }
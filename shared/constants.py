@@ -1,20 +1,54 @@
 # Network settings
 PORT = 5555
 HOST = "0.0.0.0"
+SEND_QUEUE_SIZE = 16  # Frames buffered per client before stale STATE frames are dropped
+CLOSE_TIMEOUT = 1  # Seconds a closed client's writer thread may keep draining before the socket is shut down
+LAG_REPORT_INTERVAL = 5  # Seconds between reports of clients whose STATE frames were dropped
+DELTA_MAX_AGE = 45  # Snapshots a client's acknowledged baseline may lag before it gets a keyframe
+MAX_ROOMS = 64  # Concurrent matches served by one server process
+ROOM_CODE_LENGTH = 4
+JOIN_TIMEOUT = 5  # Seconds a sharded server waits for a new client's JOIN before dropping it
+MAX_JOIN_SIZE = 1024  # Largest JOIN frame the sharded server's acceptor will read
+HANDOFF_SIZE = 65536  # Largest message between the acceptor and its room workers
+RECV_BUFFER_SIZE = 65536  # Initial bytes of each connection's receive buffer, grown for larger frames
+MAX_FRAME_SIZE = 65536  # Largest frame either side accepts, well above a MAP frame for a full tile grid
 
 # Game settings
 SCREEN_WIDTH = 640
 SCREEN_HEIGHT = 360
-FPS = 45
+TICK_RATE = 45  # Simulation steps per second on the server, and client frames per second so prediction steps in ticks
+MAX_CATCH_UP_TICKS = 5  # Ticks the server runs back to back after a hiccup before skipping the rest
+TICK_REPORT_INTERVAL = 5  # Seconds between server tick timing reports
+SEND_RATE = 30  # STATE snapshots sent per second, at most TICK_RATE
+MIN_SEND_RATE = 5  # Lowest per-client send rate when its bandwidth can't keep up
+SEND_RATE_STEP = 5  # Snapshots per second a client's rate recovers each window it keeps up
+SEND_RATE_WINDOW = 1  # Seconds of traffic measured before a client's send rate is re-capped
+PREDICTION_HISTORY = 90  # Predicted frames a client keeps to replay over the server's state
+INTERPOLATION_DELAY = 0.05  # Least seconds remote players are drawn behind the newest snapshot
+INTERPOLATION_INTERVALS = 2  # Snapshot intervals the delay covers, so one late STATE doesn't stall motion
+INTERPOLATION_BUFFER_SIZE = 16  # Snapshots kept per remote player
+EXTRAPOLATION_LIMIT = 0.1  # Seconds remote motion continues past the newest snapshot when STATE is late
+PLAYER_COLORS = ["red", "blue", "green", "yellow", "purple", "orange", "pink", "cyan"]
+
+BACKGROUND_COLOR = (255, 255, 255)
+
+# Input settings, INPUT packets carry held buttons as a bitmask
+INPUT_LEFT = 1
+INPUT_RIGHT = 2
+INPUT_KEEPALIVE = 0.5  # Seconds between resends of unchanged input
+INPUT_QUEUE_LIMIT = 4  # Queued INPUTs a player may fall behind by before the oldest are skipped
 
 # Tile settings
 TILE_SIZE = 16
 GRID_WIDTH = SCREEN_WIDTH // TILE_SIZE
 GRID_HEIGHT = -(SCREEN_HEIGHT // -TILE_SIZE)
 DEFAULT_PLATFORM_COLOR = (120, 120, 120)
+MAP_CACHE_DIR = "~/.territory_ascent/maps"  # Where clients keep downloaded maps, None keeps them in memory only
 
 # World Settings
-Y_GRAVITY = 60 / FPS 
+Y_GRAVITY = 60 / TICK_RATE
 
 # Font settings
 FONT_NAME = "Segoe UI Symbol"
+DIRTY_RECT_RENDERING = True  # Rescale and upload only the screen regions that changed each frame
+TEXT_CACHE_SIZE = 64  # Rendered labels the client keeps before dropping the least recently used
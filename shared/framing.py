@@ -0,0 +1,95 @@
+# Length-prefixed framing shared by server and client: 4-byte big-endian length, then the payload
+from . import constants
+
+
+class FrameReader:
+    """Receives frames from a socket into one reusable buffer.
+
+    Each recv_into takes as many bytes as the socket has buffered, and every
+    complete frame among them is returned as a memoryview into the buffer,
+    so a burst of frames costs one syscall and no copies. Returned frames
+    are only valid until the next fill().
+    """
+
+    def __init__(self, sock, size=constants.RECV_BUFFER_SIZE):
+        self.sock = sock
+        self.buffer = bytearray(size)
+        self.view = memoryview(self.buffer)
+        self.start = 0  # First byte not yet returned as part of a frame
+        self.end = 0  # End of the received bytes
+
+    def make_room(self, needed):
+        """Moves unread bytes to the front, growing the buffer if they plus needed don't fit."""
+        unread = self.end - self.start
+        if unread + needed > len(self.buffer):
+            buffer = bytearray(max(len(self.buffer) * 2, unread + needed))
+            buffer[:unread] = self.view[self.start : self.end]
+            self.buffer = buffer
+            self.view = memoryview(buffer)
+        elif self.start:
+            self.view[:unread] = self.view[self.start : self.end]
+        self.start = 0
+        self.end = unread
+
+    def fill(self):
+        """Receives once into the free space, returns the byte count (0 once the peer closed).
+
+        Raises BlockingIOError on a non-blocking socket with nothing to read, and
+        ConnectionError once a frame header announces more than MAX_FRAME_SIZE.
+        """
+        unread = self.end - self.start
+        if not unread:
+            self.start = self.end = 0
+        else:
+            # Make sure the partial frame at start fits, moving it to the front if needed
+            needed = 4
+            if unread >= 4:
+                length = int.from_bytes(self.view[self.start : self.start + 4], byteorder="big")
+                if length > constants.MAX_FRAME_SIZE:
+                    raise ConnectionError(f"Frame of {length} bytes exceeds the size limit.")
+                needed += length
+            if self.start + needed > len(self.buffer) or self.end == len(self.buffer):
+                self.make_room(max(needed - unread, 1))
+        received = self.sock.recv_into(self.view[self.end :])
+        self.end += received
+        return received
+
+    def feed(self, data):
+        """Adds bytes that were received elsewhere, e.g. by the server's acceptor."""
+        self.make_room(len(data))
+        self.view[self.end : self.end + len(data)] = data
+        self.end += len(data)
+
+    def next_frame(self):
+        """Returns the next complete frame's payload, or None until more bytes arrive."""
+        available = self.end - self.start
+        if available < 4:
+            return None
+        length = int.from_bytes(self.view[self.start : self.start + 4], byteorder="big")
+        if available < 4 + length:
+            return None
+
+        frame = self.view[self.start + 4 : self.start + 4 + length]
+        self.start += 4 + length
+        return frame
+
+    def frames(self):
+        """Yields every complete frame already received."""
+        frame = self.next_frame()
+        while frame is not None:
+            yield frame
+            frame = self.next_frame()
+
+    def pump(self):
+        """Yields frames as they arrive, draining everything one recv brought in before the next.
+
+        A frame is only valid until the next one is taken.
+        """
+        while True:
+            yield from self.frames()
+            if not self.fill():
+                raise ConnectionError("Connection lost while receiving message.")
+
+    def read_frame(self):
+        """Blocks until a complete frame arrives and returns its payload."""
+        return next(self.pump())
@@ -0,0 +1,8 @@
+# Map identity shared by server and client, clients cache compiled maps under the content hash
+import hashlib
+import msgpack
+
+
+def map_hash(tile_data, spawn):
+    """Returns the content hash of a {"x", "y", "type"} tile map and its spawn point."""
+    return hashlib.sha1(msgpack.packb([tile_data, list(spawn)])).hexdigest()
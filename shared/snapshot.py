@@ -0,0 +1,174 @@
+# Compact binary STATE snapshots, negotiated per client as an alternative to msgpack dicts
+#
+# Full snapshot layout (little-endian):
+#   header  B magic (0xC1, never used by msgpack), B kind, I server tick, B player count,
+#           H tile count
+#   player  B color index, f x, f y, B flags (bit 0: in_air)
+#   tile    B column, B row, B color index (DEFAULT_COLOR_INDEX: unoccupied)
+#
+# Delta snapshot layout, only fields changed since the client's acknowledged snapshot:
+#   header  B magic, B kind, B flags (bit 0: keyframe), I sequence, I server tick,
+#           H present color bitmask, B player count, H tile count
+#   player  B color index, B field mask (DELTA_X, DELTA_Y, DELTA_IN_AIR), [f x], [f y]
+#   tile    same as the full snapshot
+import struct
+from . import constants
+
+MAGIC = 0xC1
+KIND_STATE = 0
+KIND_DELTA = 1
+
+FORMATS = ["msgpack", "binary", "delta"]
+
+DEFAULT_COLOR_INDEX = 0xFF
+FLAG_IN_AIR = 0x01
+FLAG_KEYFRAME = 0x01
+
+# Delta field mask
+DELTA_X = 0x01
+DELTA_Y = 0x02
+DELTA_IN_AIR = 0x04  # in_air value follows in DELTA_IN_AIR_VALUE
+DELTA_IN_AIR_VALUE = 0x08
+
+HEADER = struct.Struct("<BBIBH")
+PLAYER = struct.Struct("<BffB")
+TILE = struct.Struct("<BBB")
+
+DELTA_HEADER = struct.Struct("<BBBIIHBH")
+DELTA_PLAYER = struct.Struct("<BB")
+COORD = struct.Struct("<f")
+
+COLOR_INDEX = {color: i for i, color in enumerate(constants.PLAYER_COLORS)}
+
+
+def is_snapshot(payload):
+    return len(payload) > 0 and payload[0] == MAGIC
+
+
+def snapshot_kind(payload):
+    return payload[1]
+
+
+def pack_tile(x, y, color):
+    return TILE.pack(
+        x // constants.TILE_SIZE,
+        y // constants.TILE_SIZE,
+        COLOR_INDEX.get(color, DEFAULT_COLOR_INDEX),
+    )
+
+
+def unpack_tiles(payload):
+    return [
+        (
+            col * constants.TILE_SIZE,
+            row * constants.TILE_SIZE,
+            list(constants.DEFAULT_PLATFORM_COLOR)
+            if index == DEFAULT_COLOR_INDEX
+            else constants.PLAYER_COLORS[index],
+        )
+        for col, row, index in TILE.iter_unpack(payload)
+    ]
+
+
+def encode_state(tick, players, tiles):
+    """Packs (color, x, y, in_air) players and {"x", "y", "color"} tile changes."""
+    tiles = tiles or []
+    parts = [HEADER.pack(MAGIC, KIND_STATE, tick, len(players), len(tiles))]
+    for color, x, y, in_air in players:
+        parts.append(PLAYER.pack(COLOR_INDEX[color], x, y, FLAG_IN_AIR if in_air else 0))
+    for tile in tiles:
+        parts.append(pack_tile(tile["x"], tile["y"], tile["color"]))
+    return b"".join(parts)
+
+
+def decode_state(payload):
+    """Returns (tick, [(color, x, y, in_air)], [(x, y, color)]) from a binary snapshot."""
+    payload = memoryview(payload)
+    magic, kind, tick, player_count, tile_count = HEADER.unpack_from(payload)
+    offset = HEADER.size
+
+    players_end = offset + player_count * PLAYER.size
+    players = [
+        (constants.PLAYER_COLORS[index], x, y, bool(flags & FLAG_IN_AIR))
+        for index, x, y, flags in PLAYER.iter_unpack(payload[offset:players_end])
+    ]
+
+    tiles_end = players_end + tile_count * TILE.size
+    return tick, players, unpack_tiles(payload[players_end:tiles_end])
+
+
+def encode_delta(sequence, tick, keyframe, present, players, tiles):
+    """Packs a delta snapshot.
+
+    present lists every color in the group, players holds (color, x, y, in_air)
+    entries where unchanged fields are None, tiles holds (x, y, color) changes.
+    """
+    present_mask = 0
+    for color in present:
+        present_mask |= 1 << COLOR_INDEX[color]
+
+    parts = [
+        DELTA_HEADER.pack(
+            MAGIC,
+            KIND_DELTA,
+            FLAG_KEYFRAME if keyframe else 0,
+            sequence,
+            tick,
+            present_mask,
+            len(players),
+            len(tiles),
+        )
+    ]
+    for color, x, y, in_air in players:
+        mask = 0
+        if x is not None:
+            mask |= DELTA_X
+        if y is not None:
+            mask |= DELTA_Y
+        if in_air is not None:
+            mask |= DELTA_IN_AIR | (DELTA_IN_AIR_VALUE if in_air else 0)
+
+        parts.append(DELTA_PLAYER.pack(COLOR_INDEX[color], mask))
+        if x is not None:
+            parts.append(COORD.pack(x))
+        if y is not None:
+            parts.append(COORD.pack(y))
+    for x, y, color in tiles:
+        parts.append(pack_tile(x, y, color))
+    return b"".join(parts)
+
+
+def decode_delta(payload):
+    """Returns (sequence, tick, keyframe, present colors, players, tiles) from a delta snapshot.
+
+    players holds (color, x, y, in_air) entries with None for unchanged fields.
+    """
+    payload = memoryview(payload)
+    magic, kind, flags, sequence, tick, present_mask, player_count, tile_count = (
+        DELTA_HEADER.unpack_from(payload)
+    )
+    offset = DELTA_HEADER.size
+
+    present = [
+        color
+        for i, color in enumerate(constants.PLAYER_COLORS)
+        if present_mask & (1 << i)
+    ]
+
+    players = []
+    for _ in range(player_count):
+        index, mask = DELTA_PLAYER.unpack_from(payload, offset)
+        offset += DELTA_PLAYER.size
+        x = y = in_air = None
+        if mask & DELTA_X:
+            x = COORD.unpack_from(payload, offset)[0]
+            offset += COORD.size
+        if mask & DELTA_Y:
+            y = COORD.unpack_from(payload, offset)[0]
+            offset += COORD.size
+        if mask & DELTA_IN_AIR:
+            in_air = bool(mask & DELTA_IN_AIR_VALUE)
+        players.append((constants.PLAYER_COLORS[index], x, y, in_air))
+
+    tiles = unpack_tiles(payload[offset : offset + tile_count * TILE.size])
+    return sequence, tick, bool(flags & FLAG_KEYFRAME), present, players, tiles